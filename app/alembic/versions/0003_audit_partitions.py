@@ -0,0 +1,89 @@
+"""partitioned audit log with jsonb metadata
+
+Revision ID: 0003_audit_partitions
+Revises: 0002_courses_and_updates
+Create Date: 2026-10-19
+"""
+
+from datetime import date
+from alembic import op
+import sqlalchemy as sa
+from app.services.audit_retention import add_months
+
+revision = "0003_audit_partitions"
+down_revision = "0002_courses_and_updates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+    op.execute("ALTER INDEX IF EXISTS audit_logs_pkey RENAME TO audit_logs_legacy_pkey")
+    op.execute("CREATE SEQUENCE audit_log_seq AS bigint")
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id bigint NOT NULL DEFAULT nextval('audit_log_seq'),
+            actor_user_id integer REFERENCES users (id),
+            action varchar(120) NOT NULL,
+            entity varchar(120) NOT NULL,
+            entity_id varchar(120) NOT NULL,
+            metadata jsonb NOT NULL DEFAULT '{}'::jsonb,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE audit_log_seq OWNED BY audit_logs.id")
+
+    oldest = conn.execute(sa.text("SELECT min(created_at) FROM audit_logs_legacy")).scalar()
+    current = date.today().replace(day=1)
+    month = date(oldest.year, oldest.month, 1) if oldest else current
+    while month <= add_months(current, 2):
+        upper = add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE audit_logs_{month:%Y_%m} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    op.execute("CREATE INDEX ix_audit_logs_created_at_id ON audit_logs (created_at, id)")
+    op.execute("CREATE INDEX ix_audit_logs_entity ON audit_logs (entity, entity_id, created_at)")
+    op.execute("CREATE INDEX ix_audit_logs_actor ON audit_logs (actor_user_id, created_at)")
+    op.execute("CREATE INDEX ix_audit_logs_metadata ON audit_logs USING gin (metadata jsonb_path_ops)")
+
+    op.execute(
+        """
+        INSERT INTO audit_logs (id, actor_user_id, action, entity, entity_id, metadata, created_at)
+        SELECT id, actor_user_id, action, entity, entity_id, COALESCE(NULLIF(metadata_json, ''), '{}')::jsonb, created_at
+        FROM audit_logs_legacy
+        """
+    )
+    op.execute("SELECT setval('audit_log_seq', COALESCE((SELECT max(id) FROM audit_logs), 0) + 1, false)")
+    op.drop_table("audit_logs_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER INDEX audit_logs_pkey RENAME TO audit_logs_partitioned_pkey")
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("actor_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("action", sa.String(length=120), nullable=False),
+        sa.Column("entity", sa.String(length=120), nullable=False),
+        sa.Column("entity_id", sa.String(length=120), nullable=False),
+        sa.Column("metadata_json", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO audit_logs (id, actor_user_id, action, entity, entity_id, metadata_json, created_at)
+        SELECT id, actor_user_id, action, entity, entity_id, metadata::text, created_at
+        FROM audit_logs_partitioned
+        """
+    )
+    op.execute("SELECT setval('audit_logs_id_seq', COALESCE((SELECT max(id) FROM audit_logs), 0) + 1, false)")
+    op.execute("DROP TABLE audit_logs_partitioned CASCADE")
@@ -0,0 +1,108 @@
+"""content-addressed blob store for attachments
+
+Revision ID: 0004_blobs
+Revises: 0003_audit_partitions
+Create Date: 2026-10-19
+"""
+
+from pathlib import Path
+import logging
+import os
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import get_settings
+
+revision = "0004_blobs"
+down_revision = "0003_audit_partitions"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "blobs",
+        sa.Column("sha256", sa.String(length=64), primary_key=True),
+        sa.Column("stored_path", sa.String(length=500), nullable=False),
+        sa.Column("mime_type", sa.String(length=120), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_unique_constraint("uq_blobs_stored_path", "blobs", ["stored_path"])
+
+    conn = op.get_bind()
+    upload_dir = Path(get_settings().upload_dir)
+    groups = conn.execute(
+        sa.text(
+            """
+            SELECT checksum_sha256, array_agg(stored_path), min(mime_type), max(file_size), count(*), min(uploaded_at)
+            FROM (
+                SELECT checksum_sha256, stored_path, mime_type, file_size, uploaded_at FROM attachments
+                UNION ALL
+                SELECT checksum_sha256, stored_path, mime_type, file_size, uploaded_at FROM course_update_attachments
+            ) files
+            GROUP BY checksum_sha256
+            """
+        )
+    ).all()
+
+    removed_files = 0
+    freed_bytes = 0
+    for checksum, paths, mime_type, file_size, refs, created_at in groups:
+        target = upload_dir / checksum
+        for source in map(Path, paths):
+            if source == target or not source.exists():
+                continue
+            if target.exists():
+                freed_bytes += source.stat().st_size
+                removed_files += 1
+                source.unlink()
+            else:
+                os.replace(source, target)
+        conn.execute(
+            sa.text(
+                "INSERT INTO blobs (sha256, stored_path, mime_type, file_size, ref_count, created_at) "
+                "VALUES (:sha256, :stored_path, :mime_type, :file_size, :ref_count, :created_at)"
+            ),
+            {
+                "sha256": checksum,
+                "stored_path": str(target),
+                "mime_type": mime_type,
+                "file_size": file_size,
+                "ref_count": refs,
+                "created_at": created_at,
+            },
+        )
+    logger.info(
+        "Deduplicated %s attachment blobs: removed %s duplicate files, freed %.1f MB",
+        len(groups),
+        removed_files,
+        freed_bytes / (1024 * 1024),
+    )
+
+    for table in ("attachments", "course_update_attachments"):
+        op.execute(
+            sa.text(f"UPDATE {table} SET stored_path = :prefix || checksum_sha256").bindparams(
+                prefix=f"{upload_dir}/"
+            )
+        )
+    op.drop_constraint("uq_attachments_stored_path", "attachments", type_="unique")
+    op.drop_constraint("uq_course_update_attachments_stored_path", "course_update_attachments", type_="unique")
+    op.create_foreign_key("fk_attachments_blob", "attachments", "blobs", ["checksum_sha256"], ["sha256"])
+    op.create_foreign_key(
+        "fk_course_update_attachments_blob",
+        "course_update_attachments",
+        "blobs",
+        ["checksum_sha256"],
+        ["sha256"],
+    )
+
+
+def downgrade() -> None:
+    # Deduplicated files stay shared, so the per-row stored_path unique constraints are not restored.
+    op.drop_constraint("fk_course_update_attachments_blob", "course_update_attachments", type_="foreignkey")
+    op.drop_constraint("fk_attachments_blob", "attachments", type_="foreignkey")
+    op.drop_constraint("uq_blobs_stored_path", "blobs", type_="unique")
+    op.drop_table("blobs")
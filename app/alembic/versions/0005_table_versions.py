@@ -0,0 +1,58 @@
+"""employee updated_at and per-table change counters
+
+Revision ID: 0005_table_versions
+Revises: 0004_blobs
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_table_versions"
+down_revision = "0004_blobs"
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ("employees", "certifications")
+
+
+def upgrade() -> None:
+    op.add_column(
+        "employees",
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute("UPDATE employees SET updated_at = last_synced_at WHERE last_synced_at IS NOT NULL")
+
+    op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.String(length=64), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.execute(
+        """
+        CREATE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_versions (table_name, version, updated_at)
+            VALUES (TG_TABLE_NAME, 1, now())
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = table_versions.version + 1, updated_at = now();
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(f"INSERT INTO table_versions (table_name, version, updated_at) VALUES ('{table}', 1, now())")
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table("table_versions")
+    op.drop_column("employees", "updated_at")
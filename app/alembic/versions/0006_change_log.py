@@ -0,0 +1,70 @@
+"""change log feed for incremental sync
+
+Revision ID: 0006_change_log
+Revises: 0005_table_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_change_log"
+down_revision = "0005_table_versions"
+branch_labels = None
+depends_on = None
+
+FEED_TABLES = {
+    "employees": "employee",
+    "certifications": "certification",
+    "courses": "course",
+    "employee_courses": "employee_course",
+    "attachments": "attachment",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "change_log",
+        sa.Column("seq", sa.BigInteger(), primary_key=True),
+        sa.Column(
+            "txid",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("pg_current_xact_id()::text::bigint"),
+        ),
+        sa.Column("entity", sa.String(length=40), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(length=10), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_change_log_txid_seq", "change_log", ["txid", "seq"])
+    op.execute(
+        """
+        CREATE FUNCTION log_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO change_log (entity, entity_id, op) VALUES (TG_ARGV[0], OLD.id, 'delete');
+            ELSE
+                INSERT INTO change_log (entity, entity_id, op) VALUES (TG_ARGV[0], NEW.id, 'upsert');
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table, entity in FEED_TABLES.items():
+        op.execute(
+            f"INSERT INTO change_log (entity, entity_id, op) SELECT '{entity}', id, 'upsert' FROM {table} ORDER BY id"
+        )
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_change_log AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION log_change('{entity}')"
+        )
+
+
+def downgrade() -> None:
+    for table in FEED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_change_log ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS log_change()")
+    op.drop_index("ix_change_log_txid_seq", table_name="change_log")
+    op.drop_table("change_log")
@@ -0,0 +1,30 @@
+"""table version counters for course assignments
+
+Revision ID: 0007_course_versions
+Revises: 0006_change_log
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0007_course_versions"
+down_revision = "0006_change_log"
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ("courses", "employee_courses", "employee_course_updates")
+
+
+def upgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"INSERT INTO table_versions (table_name, version, updated_at) VALUES ('{table}', 1, now())")
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table}")
+        op.execute(f"DELETE FROM table_versions WHERE table_name = '{table}'")
@@ -0,0 +1,25 @@
+"""index employee courses by course and refresh due date
+
+Revision ID: 0008_employee_course_due_index
+Revises: 0007_course_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "0008_employee_course_due_index"
+down_revision = "0007_course_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_employee_courses_course_due",
+        "employee_courses",
+        ["course_id", "next_refresh_due_date"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_employee_courses_course_due", table_name="employee_courses")
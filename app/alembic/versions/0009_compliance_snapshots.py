@@ -0,0 +1,36 @@
+"""daily compliance snapshots
+
+Revision ID: 0009_compliance_snapshots
+Revises: 0008_employee_course_due_index
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_compliance_snapshots"
+down_revision = "0008_employee_course_due_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "compliance_snapshots",
+        sa.Column("snapshot_date", sa.Date(), nullable=False),
+        sa.Column("location", sa.String(length=120), nullable=False),
+        sa.Column("cost_center", sa.String(length=120), nullable=False),
+        sa.Column("cert_type", sa.String(length=120), nullable=False),
+        sa.Column("certs_valid", sa.Integer(), nullable=False),
+        sa.Column("certs_expiring", sa.Integer(), nullable=False),
+        sa.Column("certs_expired", sa.Integer(), nullable=False),
+        sa.Column("courses_due_soon", sa.Integer(), nullable=False),
+        sa.Column("courses_overdue", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("snapshot_date", "location", "cost_center", "cert_type"),
+    )
+    op.create_index("ix_compliance_snapshots_location_date", "compliance_snapshots", ["location", "snapshot_date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_compliance_snapshots_location_date", table_name="compliance_snapshots")
+    op.drop_table("compliance_snapshots")
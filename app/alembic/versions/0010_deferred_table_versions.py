@@ -0,0 +1,88 @@
+"""bump table versions once per transaction at commit time
+
+Revision ID: 0010_deferred_table_versions
+Revises: 0009_compliance_snapshots
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_deferred_table_versions"
+down_revision = "0009_compliance_snapshots"
+branch_labels = None
+depends_on = None
+
+VERSIONED_TABLES = ("employees", "certifications", "courses", "employee_courses", "employee_course_updates")
+
+
+def upgrade() -> None:
+    # Statement triggers used to update the table_versions row on the first write and hold its lock until
+    # commit, serialising all writers of a table behind long imports. Now the statement trigger only queues
+    # one pending row per table per transaction, and a deferred trigger on that row bumps the version at
+    # commit, so the hot row is locked only while the transaction commits.
+    op.create_table(
+        "table_version_pending",
+        sa.Column("table_name", sa.String(length=64), nullable=False),
+        sa.Column(
+            "txid",
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("pg_current_xact_id()::text::bigint"),
+        ),
+        prefixes=["UNLOGGED"],
+    )
+    op.execute(
+        """
+        CREATE FUNCTION mark_table_changed() RETURNS trigger AS $$
+        BEGIN
+            IF current_setting('traccia.version_pending_' || TG_TABLE_NAME, true) = '1' THEN
+                RETURN NULL;
+            END IF;
+            PERFORM set_config('traccia.version_pending_' || TG_TABLE_NAME, '1', true);
+            INSERT INTO table_version_pending (table_name) VALUES (TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # clock_timestamp() instead of now(): the bump runs at commit, and a transaction that started earlier
+    # may commit later, so Last-Modified must never move backwards.
+    op.execute(
+        """
+        CREATE FUNCTION apply_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_versions (table_name, version, updated_at)
+            VALUES (NEW.table_name, 1, clock_timestamp())
+            ON CONFLICT (table_name) DO UPDATE
+            SET version = table_versions.version + 1,
+                updated_at = GREATEST(table_versions.updated_at, clock_timestamp());
+            DELETE FROM table_version_pending WHERE table_name = NEW.table_name AND txid = NEW.txid;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE CONSTRAINT TRIGGER trg_table_version_pending AFTER INSERT ON table_version_pending "
+        "DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION apply_table_version()"
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table}")
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION mark_table_changed()"
+        )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table}")
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+    op.execute("DROP TRIGGER IF EXISTS trg_table_version_pending ON table_version_pending")
+    op.execute("DROP FUNCTION IF EXISTS apply_table_version()")
+    op.execute("DROP FUNCTION IF EXISTS mark_table_changed()")
+    op.drop_table("table_version_pending")
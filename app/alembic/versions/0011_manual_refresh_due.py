@@ -0,0 +1,42 @@
+"""flag refresh updates whose next due date was entered by hand
+
+Revision ID: 0011_manual_refresh_due
+Revises: 0010_deferred_table_versions
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_manual_refresh_due"
+down_revision = "0010_deferred_table_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "employee_course_updates",
+        sa.Column("due_date_manual", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    # Older rows did not record whether the date was typed in, so any date that differs from
+    # update_date + the course interval is treated as a manual override.
+    op.execute(
+        """
+        UPDATE employee_course_updates u
+        SET due_date_manual = true
+        FROM employee_courses ec
+        JOIN courses c ON c.id = ec.course_id
+        WHERE ec.id = u.employee_course_id
+          AND u.next_refresh_due_date IS NOT NULL
+          AND u.next_refresh_due_date IS DISTINCT FROM (
+              CASE WHEN c.requires_refresh AND c.refresh_interval_days > 0
+                   THEN u.update_date + c.refresh_interval_days
+              END
+          )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("employee_course_updates", "due_date_manual")
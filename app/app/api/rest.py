@@ -1,40 +1,60 @@
-from datetime import date, timedelta
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models import Employee, Certification, Attachment, AlertSetting
-from app.schemas.api import CertificationCreate, SettingsUpdate
-from app.services.auth import get_current_user, require_role
-from app.services.certifications import status_for_expiry
-from app.services.files import store_upload
+from datetime import date, datetime, timedelta
+import base64
+import json
+from fastapi import APIRouter, Depends, File, Path, Query, Request, Response, UploadFile, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import Integer, any_, bindparam, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from app.db.session import get_db, get_async_db
+from app.models import Employee, Certification, Course, Attachment, AuditLog
+from app.schemas.api import BulkAssignmentRequest, CertificationBatchRequest, CertificationCreate, SettingsUpdate
+from app.services.auth import get_current_user, get_current_user_async, require_role
+from app.services.certifications import filter_certifications, status_for_expiry
+from app.services.files import store_uploads, acquire_blob, release_blob
+from app.services.previews import schedule_preview
 from app.services.factorial import sync_factorial_employees
-from app.services.settings_store import set_setting, get_setting
+from app.services.settings_store import FACTORIAL_KEYS, get_settings_snapshot, set_alert_rule, set_setting
 from app.services.audit import write_audit
-from app.core.config import get_settings
+from app.services.exports import iter_attachments_zip, iter_certifications_export, iter_course_status_export
+from app.services.http_cache import list_validators
+from app.services.changes import read_changes
+from app.services.cert_import import detect_format, import_certifications
+from app.services.courses import bulk_assign_course, course_statistics
+from app.services.compliance import build_compliance_matrix, iter_compliance_csv
+from app.services.reports import compliance_trends
 
 router = APIRouter(prefix="/api")
 
 
 @router.get("/employees")
-def api_employees(
+async def api_employees(
+    request: Request,
+    response: Response,
     q: str = "",
     active: bool | None = None,
     location: str = "",
-    db: Session = Depends(get_db),
-    _=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(get_current_user_async),
 ):
-    query = db.query(Employee)
+    validators = await list_validators(db, request, ("employees",), date.today())
+    if cached := validators.not_modified(request):
+        return cached
+    response.headers.update(validators.headers)
+
+    stmt = select(Employee)
     if q:
         like = f"%{q}%"
-        query = query.filter(
+        stmt = stmt.where(
             Employee.first_name.ilike(like) | Employee.last_name.ilike(like) | Employee.email.ilike(like)
         )
     if active is not None:
-        query = query.filter(Employee.is_active == active)
+        stmt = stmt.where(Employee.is_active == active)
     if location:
-        query = query.filter(Employee.location == location)
+        stmt = stmt.where(Employee.location == location)
 
-    rows = query.order_by(Employee.last_name.asc()).all()
+    rows = (await db.scalars(stmt.order_by(Employee.last_name.asc()))).all()
     return [
         {
             "id": e.id,
@@ -71,6 +91,46 @@ def api_employee_certifications(
     ]
 
 
+@router.post("/certifications/batch")
+async def api_certifications_batch(
+    payload: CertificationBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(get_current_user_async),
+):
+    as_of = payload.as_of or date.today()
+    fields = list(dict.fromkeys(payload.fields))
+    columns = {name: getattr(Certification, name) for name in fields if name != "status"}
+    if "status" in fields:
+        columns.setdefault("expiry_date", Certification.expiry_date)
+    employee_ids = list(dict.fromkeys(payload.employee_ids))
+
+    stmt = (
+        select(Certification.employee_id, *columns.values())
+        .where(Certification.employee_id == any_(bindparam("employee_ids", employee_ids, type_=ARRAY(Integer))))
+        .order_by(Certification.employee_id, Certification.expiry_date)
+    )
+    grouped: dict[int, list[dict]] = {employee_id: [] for employee_id in employee_ids}
+    for row in await db.execute(stmt):
+        values = row._mapping
+        item = {name: values[name] for name in fields if name != "status"}
+        if "status" in fields:
+            item["status"] = status_for_expiry(values["expiry_date"], as_of)
+        grouped[row.employee_id].append(item)
+    return {"as_of": as_of, "employees": grouped}
+
+
+@router.post("/certifications/import")
+def api_import_certifications(
+    file: UploadFile = File(...),
+    strict: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(require_role("manager")),
+):
+    filename = file.filename or "import"
+    fmt = detect_format(filename, file.content_type)
+    return import_certifications(db, file.file, fmt, user.id, filename=filename, strict=strict)
+
+
 @router.post("/employees/{employee_id}/certifications")
 def api_create_certification(
     employee_id: int,
@@ -93,9 +153,9 @@ def api_create_certification(
         updated_by=user.id,
     )
     db.add(cert)
-    db.commit()
-    db.refresh(cert)
+    db.flush()
     write_audit(db, user.id, "create", "certification", str(cert.id), {"employee_id": employee_id})
+    db.commit()
     return {"id": cert.id}
 
 
@@ -116,8 +176,8 @@ def api_update_certification(
     cert.expiry_date = payload.expiry_date
     cert.notes = payload.notes
     cert.updated_by = user.id
-    db.commit()
     write_audit(db, user.id, "update", "certification", str(cert.id), {"employee_id": cert.employee_id})
+    db.commit()
     return {"ok": True}
 
 
@@ -131,9 +191,11 @@ def api_delete_certification(
     if not cert:
         raise HTTPException(status_code=404, detail="Certification not found")
     employee_id = cert.employee_id
+    for att in cert.attachments:
+        release_blob(db, att.checksum_sha256)
     db.delete(cert)
-    db.commit()
     write_audit(db, user.id, "delete", "certification", str(cert_id), {"employee_id": employee_id})
+    db.commit()
     return {"ok": True}
 
 
@@ -148,24 +210,33 @@ def api_upload_attachment(
     if not cert:
         raise HTTPException(status_code=404, detail="Certification not found")
 
-    created = []
-    for f in files:
-        path, size, checksum = store_upload(f)
-        row = Attachment(
-            certification_id=cert_id,
-            original_filename=f.filename or "file",
-            stored_path=path,
-            mime_type=f.content_type or "application/octet-stream",
-            file_size=size,
-            checksum_sha256=checksum,
-            uploaded_by=user.id,
-        )
-        db.add(row)
+    stored_files = store_uploads(files)
+    try:
+        rows = []
+        for f, stored in zip(files, stored_files):
+            acquire_blob(db, stored)
+            row = Attachment(
+                certification_id=cert_id,
+                original_filename=f.filename or "file",
+                stored_path=stored.path,
+                mime_type=stored.mime_type,
+                file_size=stored.size,
+                checksum_sha256=stored.checksum,
+                uploaded_by=user.id,
+            )
+            db.add(row)
+            rows.append(row)
+        db.flush()
+        for row in rows:
+            write_audit(db, user.id, "create", "attachment", str(row.id), {"certification_id": cert_id})
         db.commit()
-        db.refresh(row)
-        write_audit(db, user.id, "create", "attachment", str(row.id), {"certification_id": cert_id})
-        created.append({"id": row.id, "filename": row.original_filename})
-    return created
+    except Exception:
+        db.rollback()
+        raise
+
+    for stored in stored_files:
+        schedule_preview(stored.checksum, stored.path, stored.mime_type)
+    return [{"id": row.id, "filename": row.original_filename} for row in rows]
 
 
 @router.delete("/attachments/{attachment_id}")
@@ -178,62 +249,203 @@ def api_delete_attachment(
     if not row:
         raise HTTPException(status_code=404, detail="Attachment not found")
     certification_id = row.certification_id
+    release_blob(db, row.checksum_sha256)
     db.delete(row)
-    db.commit()
     write_audit(db, user.id, "delete", "attachment", str(attachment_id), {"certification_id": certification_id})
+    db.commit()
     return {"ok": True}
 
 
 @router.get("/certifications")
-def api_certifications(
+async def api_certifications(
+    request: Request,
+    response: Response,
     cert_type: str = "",
     status: str = "",
     location: str = "",
     expires_within_days: int = 0,
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(get_current_user_async),
+):
+    today = date.today()
+    validators = await list_validators(db, request, ("certifications", "employees"), today)
+    if cached := validators.not_modified(request):
+        return cached
+    response.headers.update(validators.headers)
+
+    stmt = select(Certification).join(Certification.employee).options(contains_eager(Certification.employee))
+    stmt = filter_certifications(stmt, today, cert_type, status, location, expires_within_days)
+    rows = (await db.scalars(stmt.order_by(Certification.expiry_date.asc()))).all()
+    return [
+        {
+            "id": c.id,
+            "employee_id": c.employee_id,
+            "employee": f"{c.employee.first_name} {c.employee.last_name}",
+            "cert_type": c.cert_type,
+            "title": c.title,
+            "expiry_date": c.expiry_date,
+            "status": status_for_expiry(c.expiry_date, today),
+        }
+        for c in rows
+    ]
+
+
+@router.get("/courses")
+def api_courses(db: Session = Depends(get_db), _=Depends(get_current_user)):
+    return [
+        {
+            "id": row["course"].id,
+            "title": row["course"].title,
+            "provider": row["course"].provider,
+            "requires_refresh": row["course"].requires_refresh,
+            "refresh_interval_days": row["course"].refresh_interval_days,
+            "is_active": row["course"].is_active,
+            "assigned": row["assigned"],
+            "completed": row["completed"],
+            "due_soon": row["due_soon"],
+            "overdue": row["overdue"],
+        }
+        for row in course_statistics(db)
+    ]
+
+
+@router.post("/courses/{course_id}/assignments/bulk")
+def api_bulk_assign_course(
+    course_id: int,
+    payload: BulkAssignmentRequest,
+    db: Session = Depends(get_db),
+    user=Depends(require_role("manager")),
+):
+    course = db.get(Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if not payload.employee_ids and not payload.location and not payload.cost_center:
+        raise HTTPException(status_code=400, detail="Specify employee_ids, location or cost_center")
+    return bulk_assign_course(
+        db,
+        course,
+        user.id,
+        employee_ids=payload.employee_ids,
+        location=payload.location,
+        cost_center=payload.cost_center,
+        active=payload.active,
+        completed_date=payload.completed_date,
+        notes=payload.notes,
+    )
+
+
+@router.get("/reports/compliance-matrix")
+def api_compliance_matrix(
+    location: str = "",
+    cost_center: str = "",
+    format: str = Query("json", pattern="^(json|csv)$"),
     db: Session = Depends(get_db),
     _=Depends(get_current_user),
 ):
-    today = date.today()
-    query = db.query(Certification).join(Certification.employee)
-    if cert_type:
-        query = query.filter(Certification.cert_type == cert_type)
-    if location:
-        query = query.filter(Employee.location == location)
-    if expires_within_days > 0:
-        query = query.filter(Certification.expiry_date <= today + timedelta(days=expires_within_days))
-
-    rows = query.order_by(Certification.expiry_date.asc()).all()
-    response = []
-    for c in rows:
-        computed = status_for_expiry(c.expiry_date)
-        if status and computed != status:
-            continue
-        response.append(
-            {
-                "id": c.id,
-                "employee_id": c.employee_id,
-                "employee": f"{c.employee.first_name} {c.employee.last_name}",
-                "cert_type": c.cert_type,
-                "title": c.title,
-                "expiry_date": c.expiry_date,
-                "status": computed,
-            }
+    matrix = build_compliance_matrix(db, location=location, cost_center=cost_center)
+    if format == "csv":
+        return StreamingResponse(
+            iter_compliance_csv(matrix),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="compliance-matrix.csv"'},
         )
-    return response
+    return JSONResponse(matrix)
+
+
+@router.get("/reports/trends")
+def api_compliance_trends(
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    location: str = "",
+    cost_center: str = "",
+    cert_type: str = "",
+    db: Session = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    end = date_to or date.today()
+    start = date_from or end - timedelta(days=90)
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    return compliance_trends(db, start, end, location=location, cost_center=cost_center, cert_type=cert_type)
+
+
+@router.get("/changes")
+async def api_changes(
+    since: str = "",
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db),
+    _=Depends(get_current_user_async),
+):
+    return await read_changes(db, since, limit)
+
+
+@router.get("/exports/attachments.zip")
+def api_export_attachments_zip(
+    employee_id: int | None = None,
+    course_id: int | None = None,
+    cert_type: str = "",
+    location: str = "",
+    _=Depends(get_current_user),
+):
+    return StreamingResponse(
+        iter_attachments_zip(employee_id=employee_id, course_id=course_id, cert_type=cert_type, location=location),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="attachments.zip"'},
+    )
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _export_response(chunks, name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/exports/certifications.{fmt}")
+def api_export_certifications(
+    fmt: str = Path(pattern="^(csv|xlsx)$"),
+    cert_type: str = "",
+    status: str = "",
+    location: str = "",
+    expires_within_days: int = 0,
+    _=Depends(get_current_user),
+):
+    chunks = iter_certifications_export(
+        fmt, cert_type=cert_type, status=status, location=location, expires_within_days=expires_within_days
+    )
+    return _export_response(chunks, "certifications", fmt)
+
+
+@router.get("/exports/course-status.{fmt}")
+def api_export_course_status(
+    fmt: str = Path(pattern="^(csv|xlsx)$"),
+    course_id: int | None = None,
+    location: str = "",
+    cost_center: str = "",
+    _=Depends(get_current_user),
+):
+    chunks = iter_course_status_export(fmt, course_id=course_id, location=location, cost_center=cost_center)
+    return _export_response(chunks, "course-status", fmt)
 
 
 @router.get("/admin/settings")
-def api_get_settings(db: Session = Depends(get_db), _=Depends(require_role("admin"))):
-    cfg = get_settings()
-    base = db.query(AlertSetting).filter(AlertSetting.cert_type.is_(None)).first()
+def api_get_settings(_=Depends(require_role("admin"))):
+    snapshot = get_settings_snapshot()
+    base = snapshot.rule_for(None)
     return {
-        "factorial_base_url": get_setting(db, "factorial_base_url", cfg.factorial_base_url),
-        "factorial_api_token": get_setting(db, "factorial_api_token", cfg.factorial_api_token),
-        "factorial_company_id": get_setting(db, "factorial_company_id", cfg.factorial_company_id),
-        "thresholds_csv": base.thresholds_csv if base else "90,60,30,14,7,1",
-        "recipient_emails": base.recipient_emails if base else "",
-        "email_enabled": base.email_enabled if base else True,
-        "webhook_enabled": base.webhook_enabled if base else False,
+        **{key: snapshot.get(key) for key in FACTORIAL_KEYS},
+        "thresholds_csv": base.thresholds_csv,
+        "recipient_emails": base.recipient_emails,
+        "email_enabled": base.email_enabled,
+        "webhook_enabled": base.webhook_enabled,
+        "version": snapshot.version,
     }
 
 
@@ -246,19 +458,96 @@ def api_update_settings(
     set_setting(db, "factorial_base_url", payload.factorial_base_url)
     set_setting(db, "factorial_api_token", payload.factorial_api_token)
     set_setting(db, "factorial_company_id", payload.factorial_company_id)
-
-    rule = db.query(AlertSetting).filter(AlertSetting.cert_type.is_(None)).first()
-    if not rule:
-        rule = AlertSetting(cert_type=None)
-        db.add(rule)
-    rule.thresholds_csv = payload.thresholds_csv
-    rule.recipient_emails = payload.recipient_emails
-    rule.email_enabled = payload.email_enabled
-    rule.webhook_enabled = payload.webhook_enabled
+    set_alert_rule(
+        db,
+        None,
+        thresholds_csv=payload.thresholds_csv,
+        recipient_emails=payload.recipient_emails,
+        email_enabled=payload.email_enabled,
+        webhook_enabled=payload.webhook_enabled,
+    )
     db.commit()
     return {"ok": True}
 
 
+def _encode_audit_cursor(row: AuditLog) -> str:
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_audit_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_meta_filters(items: list[str]) -> dict:
+    filters = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise HTTPException(status_code=400, detail=f"Invalid meta filter: {item}")
+        try:
+            filters[key] = json.loads(value)
+        except ValueError:
+            filters[key] = value
+    return filters
+
+
+@router.get("/admin/audit")
+def api_audit_log(
+    actor_user_id: int | None = None,
+    entity: str = "",
+    entity_id: str = "",
+    action: str = "",
+    meta: list[str] = Query(default=[]),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str = "",
+    limit: int = Query(default=100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    _=Depends(require_role("admin")),
+):
+    stmt = select(AuditLog)
+    if actor_user_id is not None:
+        stmt = stmt.where(AuditLog.actor_user_id == actor_user_id)
+    if entity:
+        stmt = stmt.where(AuditLog.entity == entity)
+    if entity_id:
+        stmt = stmt.where(AuditLog.entity_id == entity_id)
+    if action:
+        stmt = stmt.where(AuditLog.action == action)
+    if meta:
+        stmt = stmt.where(AuditLog.meta.contains(_parse_meta_filters(meta)))
+    if since:
+        stmt = stmt.where(AuditLog.created_at >= since)
+    if until:
+        stmt = stmt.where(AuditLog.created_at < until)
+    if cursor:
+        stmt = stmt.where(tuple_(AuditLog.created_at, AuditLog.id) < tuple_(*_decode_audit_cursor(cursor)))
+
+    rows = db.scalars(stmt.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [
+            {
+                "id": r.id,
+                "actor_user_id": r.actor_user_id,
+                "action": r.action,
+                "entity": r.entity,
+                "entity_id": r.entity_id,
+                "metadata": r.meta,
+                "created_at": r.created_at,
+            }
+            for r in rows
+        ],
+        "next_cursor": _encode_audit_cursor(rows[-1]) if has_more else None,
+    }
+
+
 @router.post("/admin/sync/factorial")
 def api_sync_factorial(
     db: Session = Depends(get_db),
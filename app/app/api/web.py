@@ -1,17 +1,18 @@
 from datetime import date, timedelta
-from pathlib import Path
+import re
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, UploadFile, File
-from fastapi.responses import RedirectResponse, FileResponse
+from fastapi.responses import RedirectResponse, FileResponse, Response
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.db.session import get_db, SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import func, select
+from app.db.session import get_db, get_async_db, SessionLocal
 from app.models import (
     User,
     Employee,
     Certification,
     Attachment,
-    AlertSetting,
+    Blob,
     Course,
     EmployeeCourse,
     EmployeeCourseUpdate,
@@ -21,12 +22,16 @@ from app.core.security import verify_password, hash_password
 from app.core.csrf import ensure_csrf_token, validate_csrf
 from app.core.rate_limit import LoginRateLimiter
 from app.core.config import get_settings
-from app.services.auth import get_current_user, require_role
+from app.core.timing import timed
+from app.services.auth import get_current_user, get_current_user_async, require_role
 from app.services.certifications import status_for_expiry
-from app.services.files import store_upload
+from app.services.courses import compute_next_refresh_due, course_statistics, recompute_refresh_due
+from app.services.files import store_uploads, acquire_blob, release_blob, attachment_response
+from app.services.http_cache import etag_matches
+from app.services.previews import schedule_preview, preview_path, can_preview
 from app.services.factorial import sync_factorial_employees
 from app.services.audit import write_audit
-from app.services.settings_store import get_setting, set_setting
+from app.services.settings_store import FACTORIAL_KEYS, get_settings_snapshot, set_alert_rule, set_setting
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -36,27 +41,22 @@ rate_limiter = LoginRateLimiter(
 )
 
 
-def _render(request: Request, template: str, context: dict):
+def _render(request: Request, template: str, context: dict, current_user: User | None = None):
     base = {
         "request": request,
-        "current_user": None,
+        "current_user": current_user,
         "csrf_token": ensure_csrf_token(request),
     }
     user_id = request.session.get("user_id")
-    if user_id:
+    if user_id and current_user is None:
         db = SessionLocal()
         try:
             base["current_user"] = db.get(User, user_id)
         finally:
             db.close()
     base.update(context)
-    return templates.TemplateResponse(template, base)
-
-
-def _compute_next_refresh_due(base_date: date | None, interval_days: int | None) -> date | None:
-    if not base_date or not interval_days or interval_days <= 0:
-        return None
-    return base_date + timedelta(days=interval_days)
+    with timed("render"):
+        return templates.TemplateResponse(template, base)
 
 
 @router.get("/login")
@@ -97,27 +97,33 @@ def logout(request: Request, csrf_token: str = Form(...)):
 
 
 @router.get("/")
-def dashboard(
+async def dashboard(
     request: Request,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
 ):
     today = date.today()
-    certs = db.query(Certification).all()
-    expired = sum(1 for c in certs if c.expiry_date < today)
-    expiring = sum(1 for c in certs if 0 <= (c.expiry_date - today).days <= 30)
+    expired = await db.scalar(select(func.count(Certification.id)).where(Certification.expiry_date < today))
+    expiring = await db.scalar(
+        select(func.count(Certification.id)).where(
+            Certification.expiry_date >= today,
+            Certification.expiry_date <= today + timedelta(days=30),
+        )
+    )
 
     upcoming = []
     for days in [30, 60, 90]:
         lim = today + timedelta(days=days)
         items = (
-            db.query(Certification)
-            .join(Certification.employee)
-            .filter(Certification.expiry_date >= today, Certification.expiry_date <= lim)
-            .order_by(Certification.expiry_date.asc())
-            .limit(20)
-            .all()
-        )
+            await db.scalars(
+                select(Certification)
+                .join(Certification.employee)
+                .options(contains_eager(Certification.employee))
+                .where(Certification.expiry_date >= today, Certification.expiry_date <= lim)
+                .order_by(Certification.expiry_date.asc())
+                .limit(20)
+            )
+        ).all()
         upcoming.append((days, items))
 
     return _render(
@@ -129,35 +135,37 @@ def dashboard(
             "upcoming": upcoming,
             "status_for_expiry": status_for_expiry,
         },
+        current_user=user,
     )
 
 
 @router.get("/employees")
-def employee_list(
+async def employee_list(
     request: Request,
     q: str = "",
     location: str = "",
     active: str = "",
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
 ):
-    query = db.query(Employee)
+    stmt = select(Employee)
     if q:
         like = f"%{q}%"
-        query = query.filter(
+        stmt = stmt.where(
             Employee.first_name.ilike(like) | Employee.last_name.ilike(like) | Employee.email.ilike(like)
         )
     if location:
-        query = query.filter(Employee.location == location)
+        stmt = stmt.where(Employee.location == location)
     if active in {"true", "false"}:
-        query = query.filter(Employee.is_active == (active == "true"))
+        stmt = stmt.where(Employee.is_active == (active == "true"))
 
-    employees = query.order_by(Employee.last_name.asc(), Employee.first_name.asc()).all()
-    locations = [x[0] for x in db.query(Employee.location).distinct().all() if x[0]]
+    employees = (await db.scalars(stmt.order_by(Employee.last_name.asc(), Employee.first_name.asc()))).all()
+    locations = [x for x in (await db.scalars(select(Employee.location).distinct())).all() if x]
     return _render(
         request,
         "employees/list.html",
         {"employees": employees, "locations": locations, "q": q, "location": location, "active": active},
+        current_user=user,
     )
 
 
@@ -167,8 +175,20 @@ def courses_page(
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
-    courses = db.query(Course).order_by(Course.title.asc()).all()
-    return _render(request, "courses/list.html", {"courses": courses})
+    return _render(request, "courses/list.html", {"courses": course_statistics(db)})
+
+
+def _parse_refresh_interval(requires_refresh: str, refresh_interval_days: str) -> tuple[bool, int | None] | None:
+    refresh_enabled = requires_refresh == "on"
+    interval_days = None
+    if refresh_enabled and refresh_interval_days:
+        try:
+            interval_days = int(refresh_interval_days)
+        except ValueError:
+            return None
+    if refresh_enabled and (not interval_days or interval_days <= 0):
+        return None
+    return refresh_enabled, interval_days if refresh_enabled else None
 
 
 @router.post("/courses")
@@ -189,15 +209,10 @@ def create_course(
     if not normalized_title:
         return RedirectResponse("/courses", status_code=303)
 
-    refresh_enabled = requires_refresh == "on"
-    interval_days = None
-    if refresh_enabled and refresh_interval_days:
-        try:
-            interval_days = int(refresh_interval_days)
-        except ValueError:
-            return RedirectResponse("/courses", status_code=303)
-    if refresh_enabled and (not interval_days or interval_days <= 0):
+    refresh = _parse_refresh_interval(requires_refresh, refresh_interval_days)
+    if refresh is None:
         return RedirectResponse("/courses", status_code=303)
+    refresh_enabled, interval_days = refresh
 
     exists = db.query(Course).filter(func.lower(Course.title) == normalized_title.lower()).first()
     if exists:
@@ -208,12 +223,77 @@ def create_course(
         description=description or None,
         provider=provider or None,
         requires_refresh=refresh_enabled,
-        refresh_interval_days=interval_days if refresh_enabled else None,
+        refresh_interval_days=interval_days,
         is_active=is_active == "on",
     )
     db.add(course)
-    db.commit()
+    db.flush()
     write_audit(db, user.id, "create", "course", str(course.id), {})
+    db.commit()
+    return RedirectResponse("/courses", status_code=303)
+
+
+@router.get("/courses/{course_id}/edit")
+def edit_course_page(
+    course_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_role("manager")),
+):
+    course = db.get(Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404)
+    return _render(request, "courses/edit.html", {"course": course}, current_user=user)
+
+
+@router.post("/courses/{course_id}")
+def update_course(
+    course_id: int,
+    request: Request,
+    title: str = Form(...),
+    description: str = Form(""),
+    provider: str = Form(""),
+    requires_refresh: str = Form("off"),
+    refresh_interval_days: str = Form(""),
+    is_active: str = Form("off"),
+    csrf_token: str = Form(...),
+    db: Session = Depends(get_db),
+    user: User = Depends(require_role("manager")),
+):
+    validate_csrf(request, csrf_token)
+    course = db.get(Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404)
+
+    edit_url = f"/courses/{course_id}/edit"
+    normalized_title = title.strip()
+    if not normalized_title:
+        return RedirectResponse(edit_url, status_code=303)
+    refresh = _parse_refresh_interval(requires_refresh, refresh_interval_days)
+    if refresh is None:
+        return RedirectResponse(edit_url, status_code=303)
+    refresh_enabled, interval_days = refresh
+
+    duplicate = (
+        db.query(Course)
+        .filter(func.lower(Course.title) == normalized_title.lower(), Course.id != course_id)
+        .first()
+    )
+    if duplicate:
+        return RedirectResponse(edit_url, status_code=303)
+
+    refresh_changed = (course.requires_refresh, course.refresh_interval_days) != (refresh_enabled, interval_days)
+    course.title = normalized_title
+    course.description = description or None
+    course.provider = provider or None
+    course.requires_refresh = refresh_enabled
+    course.refresh_interval_days = interval_days
+    course.is_active = is_active == "on"
+    write_audit(db, user.id, "update", "course", str(course.id), {"refresh_changed": refresh_changed})
+    if refresh_changed:
+        recompute_refresh_due(db, course.id)
+    else:
+        db.commit()
     return RedirectResponse("/courses", status_code=303)
 
 
@@ -285,8 +365,9 @@ def create_certification_web(
         updated_by=user.id,
     )
     db.add(cert)
-    db.commit()
+    db.flush()
     write_audit(db, user.id, "create", "certification", str(cert.id), {"employee_id": employee_id})
+    db.commit()
     return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
 
@@ -317,7 +398,7 @@ def assign_course_to_employee(
         return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
     completed = date.fromisoformat(completed_date) if completed_date else None
-    next_due = _compute_next_refresh_due(completed, course.refresh_interval_days) if course.requires_refresh else None
+    next_due = compute_next_refresh_due(completed, course.refresh_interval_days) if course.requires_refresh else None
     row = EmployeeCourse(
         employee_id=employee_id,
         course_id=course_id,
@@ -328,8 +409,9 @@ def assign_course_to_employee(
         updated_by=user.id,
     )
     db.add(row)
-    db.commit()
+    db.flush()
     write_audit(db, user.id, "create", "employee_course", str(row.id), {"employee_id": employee_id, "course_id": course_id})
+    db.commit()
     return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
 
@@ -347,21 +429,32 @@ def upload_attachment_web(
     if not cert:
         raise HTTPException(status_code=404)
 
-    for item in files:
-        path, size, checksum = store_upload(item)
-        att = Attachment(
-            certification_id=cert.id,
-            original_filename=item.filename or "file",
-            stored_path=path,
-            mime_type=item.content_type or "application/octet-stream",
-            file_size=size,
-            checksum_sha256=checksum,
-            uploaded_by=user.id,
-        )
-        db.add(att)
+    stored_files = store_uploads(files)
+    try:
+        rows = []
+        for item, stored in zip(files, stored_files):
+            acquire_blob(db, stored)
+            att = Attachment(
+                certification_id=cert.id,
+                original_filename=item.filename or "file",
+                stored_path=stored.path,
+                mime_type=stored.mime_type,
+                file_size=stored.size,
+                checksum_sha256=stored.checksum,
+                uploaded_by=user.id,
+            )
+            db.add(att)
+            rows.append(att)
+        db.flush()
+        for att in rows:
+            write_audit(db, user.id, "create", "attachment", str(att.id), {"certification_id": cert.id})
         db.commit()
-        write_audit(db, user.id, "create", "attachment", str(att.id), {"certification_id": cert.id})
+    except Exception:
+        db.rollback()
+        raise
 
+    for stored in stored_files:
+        schedule_preview(stored.checksum, stored.path, stored.mime_type)
     return RedirectResponse(f"/employees/{cert.employee_id}", status_code=303)
 
 
@@ -390,8 +483,8 @@ def update_certification_web(
     cert.expiry_date = date.fromisoformat(expiry_date)
     cert.notes = notes or None
     cert.updated_by = user.id
-    db.commit()
     write_audit(db, user.id, "update", "certification", str(cert.id), {"employee_id": cert.employee_id})
+    db.commit()
     return RedirectResponse(f"/employees/{cert.employee_id}", status_code=303)
 
 
@@ -408,9 +501,11 @@ def delete_certification_web(
     if not cert:
         raise HTTPException(status_code=404)
     employee_id = cert.employee_id
+    for att in cert.attachments:
+        release_blob(db, att.checksum_sha256)
     db.delete(cert)
-    db.commit()
     write_audit(db, user.id, "delete", "certification", str(cert_id), {"employee_id": employee_id})
+    db.commit()
     return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
 
@@ -427,9 +522,12 @@ def delete_employee_course(
     if not employee_course:
         raise HTTPException(status_code=404)
     employee_id = employee_course.employee_id
+    for update in employee_course.updates:
+        for att in update.attachments:
+            release_blob(db, att.checksum_sha256)
     db.delete(employee_course)
-    db.commit()
     write_audit(db, user.id, "delete", "employee_course", str(employee_course_id), {"employee_id": employee_id})
+    db.commit()
     return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
 
@@ -456,80 +554,111 @@ def create_employee_course_update(
     due_date = (
         date.fromisoformat(next_refresh_due_date)
         if next_refresh_due_date
-        else _compute_next_refresh_due(refresh_date, employee_course.course.refresh_interval_days)
-    )
-
-    row = EmployeeCourseUpdate(
-        employee_course_id=employee_course_id,
-        update_date=refresh_date,
-        next_refresh_due_date=due_date,
-        notes=notes or None,
-        created_by=user.id,
+        else compute_next_refresh_due(refresh_date, employee_course.course.refresh_interval_days)
     )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-
-    employee_course.next_refresh_due_date = due_date
-    employee_course.updated_by = user.id
-    db.commit()
 
-    for item in files:
-        if not item.filename:
-            continue
-        path, size, checksum = store_upload(item)
-        att = CourseUpdateAttachment(
-            course_update_id=row.id,
-            original_filename=item.filename,
-            stored_path=path,
-            mime_type=item.content_type or "application/octet-stream",
-            file_size=size,
-            checksum_sha256=checksum,
-            uploaded_by=user.id,
+    uploads = [item for item in files if item.filename]
+    stored_files = store_uploads(uploads)
+    try:
+        row = EmployeeCourseUpdate(
+            employee_course_id=employee_course_id,
+            update_date=refresh_date,
+            next_refresh_due_date=due_date,
+            due_date_manual=bool(next_refresh_due_date),
+            notes=notes or None,
+            created_by=user.id,
         )
-        db.add(att)
+        db.add(row)
+        db.flush()
+
+        employee_course.next_refresh_due_date = due_date
+        employee_course.updated_by = user.id
+        write_audit(
+            db,
+            user.id,
+            "create",
+            "employee_course_update",
+            str(row.id),
+            {"employee_id": employee_course.employee_id, "employee_course_id": employee_course_id},
+        )
+
+        attachments = []
+        for item, stored in zip(uploads, stored_files):
+            acquire_blob(db, stored)
+            att = CourseUpdateAttachment(
+                course_update_id=row.id,
+                original_filename=item.filename,
+                stored_path=stored.path,
+                mime_type=stored.mime_type,
+                file_size=stored.size,
+                checksum_sha256=stored.checksum,
+                uploaded_by=user.id,
+            )
+            db.add(att)
+            attachments.append(att)
+        db.flush()
+        for att in attachments:
+            write_audit(db, user.id, "create", "course_update_attachment", str(att.id), {"course_update_id": row.id})
         db.commit()
-        write_audit(db, user.id, "create", "course_update_attachment", str(att.id), {"course_update_id": row.id})
+    except Exception:
+        db.rollback()
+        raise
 
-    write_audit(
-        db,
-        user.id,
-        "create",
-        "employee_course_update",
-        str(row.id),
-        {"employee_id": employee_course.employee_id, "employee_course_id": employee_course_id},
-    )
+    for stored in stored_files:
+        schedule_preview(stored.checksum, stored.path, stored.mime_type)
     return RedirectResponse(f"/employees/{employee_course.employee_id}", status_code=303)
 
 
 @router.get("/attachments/{attachment_id}")
 def download_attachment(
     attachment_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
     att = db.get(Attachment, attachment_id)
     if not att:
         raise HTTPException(status_code=404)
-    path = Path(att.stored_path)
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="File missing")
-    return FileResponse(path=path, filename=att.original_filename, media_type=att.mime_type)
+    return attachment_response(
+        request, att.stored_path, att.checksum_sha256, att.original_filename, att.mime_type
+    )
 
 
 @router.get("/course-updates/attachments/{attachment_id}")
 def download_course_update_attachment(
     attachment_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
     att = db.get(CourseUpdateAttachment, attachment_id)
     if not att:
         raise HTTPException(status_code=404)
-    path = Path(att.stored_path)
+    return attachment_response(
+        request, att.stored_path, att.checksum_sha256, att.original_filename, att.mime_type
+    )
+
+
+@router.get("/previews/{checksum}.jpg")
+def attachment_preview(
+    checksum: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    _: User = Depends(get_current_user),
+):
+    if not re.fullmatch(r"[0-9a-f]{64}", checksum):
+        raise HTTPException(status_code=404)
+    etag = f'"{checksum}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    path = preview_path(checksum)
     if not path.exists():
-        raise HTTPException(status_code=404, detail="File missing")
-    return FileResponse(path=path, filename=att.original_filename, media_type=att.mime_type)
+        blob = db.get(Blob, checksum)
+        if blob and can_preview(blob.mime_type):
+            schedule_preview(blob.sha256, blob.stored_path, blob.mime_type)
+        raise HTTPException(status_code=404)
+    return FileResponse(path=path, media_type="image/jpeg", headers=headers)
 
 
 @router.post("/attachments/{attachment_id}/delete")
@@ -545,11 +674,8 @@ def delete_attachment_web(
     if not att:
         raise HTTPException(status_code=404)
     employee_id = att.certification.employee_id
-    file_path = Path(att.stored_path)
-    if file_path.exists():
-        file_path.unlink()
+    release_blob(db, att.checksum_sha256)
     db.delete(att)
-    db.commit()
     write_audit(
         db,
         user.id,
@@ -558,6 +684,7 @@ def delete_attachment_web(
         str(attachment_id),
         {"certification_id": att.certification_id},
     )
+    db.commit()
     return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
 
@@ -574,11 +701,8 @@ def delete_course_update_attachment_web(
     if not att:
         raise HTTPException(status_code=404)
     employee_id = att.course_update.employee_course.employee_id
-    file_path = Path(att.stored_path)
-    if file_path.exists():
-        file_path.unlink()
+    release_blob(db, att.checksum_sha256)
     db.delete(att)
-    db.commit()
     write_audit(
         db,
         user.id,
@@ -587,6 +711,7 @@ def delete_course_update_attachment_web(
         str(attachment_id),
         {"course_update_id": att.course_update_id},
     )
+    db.commit()
     return RedirectResponse(f"/employees/{employee_id}", status_code=303)
 
 
@@ -631,21 +756,11 @@ def certifications_list(
 @router.get("/admin/settings")
 def settings_page(
     request: Request,
-    db: Session = Depends(get_db),
     _: User = Depends(require_role("admin")),
 ):
-    data = {
-        "factorial_base_url": get_setting(db, "factorial_base_url", get_settings().factorial_base_url),
-        "factorial_api_token": get_setting(db, "factorial_api_token", get_settings().factorial_api_token),
-        "factorial_company_id": get_setting(db, "factorial_company_id", get_settings().factorial_company_id),
-    }
-    rule = db.query(AlertSetting).filter(AlertSetting.cert_type.is_(None)).first()
-    if not rule:
-        rule = AlertSetting(cert_type=None, thresholds_csv="90,60,30,14,7,1", email_enabled=True, webhook_enabled=False)
-        db.add(rule)
-        db.commit()
-
-    return _render(request, "admin/settings.html", {"data": data, "rule": rule})
+    snapshot = get_settings_snapshot()
+    data = {key: snapshot.get(key) for key in FACTORIAL_KEYS}
+    return _render(request, "admin/settings.html", {"data": data, "rule": snapshot.rule_for(None)})
 
 
 @router.post("/admin/settings")
@@ -666,15 +781,14 @@ def settings_update(
     set_setting(db, "factorial_base_url", factorial_base_url)
     set_setting(db, "factorial_api_token", factorial_api_token)
     set_setting(db, "factorial_company_id", factorial_company_id)
-
-    rule = db.query(AlertSetting).filter(AlertSetting.cert_type.is_(None)).first()
-    if not rule:
-        rule = AlertSetting(cert_type=None)
-        db.add(rule)
-    rule.thresholds_csv = thresholds_csv
-    rule.recipient_emails = recipient_emails
-    rule.email_enabled = email_enabled == "on"
-    rule.webhook_enabled = webhook_enabled == "on"
+    set_alert_rule(
+        db,
+        None,
+        thresholds_csv=thresholds_csv,
+        recipient_emails=recipient_emails,
+        email_enabled=email_enabled == "on",
+        webhook_enabled=webhook_enabled == "on",
+    )
     db.commit()
     return RedirectResponse("/admin/settings", status_code=303)
 
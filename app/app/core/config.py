@@ -11,17 +11,32 @@ class Settings(BaseModel):
         "DATABASE_URL",
         "postgresql+psycopg2://traccia:traccia@db:5432/traccia_formazione",
     )
+    database_async_url: str = os.getenv("DATABASE_ASYNC_URL", "")
+    database_read_url: str = os.getenv("DATABASE_READ_URL", "")
+    replica_max_lag_seconds: int = int(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+    replica_lag_check_seconds: int = int(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
     host: str = os.getenv("HOST", "0.0.0.0")
     port: int = int(os.getenv("PORT", "8080"))
     session_cookie_name: str = os.getenv("SESSION_COOKIE_NAME", "tf_session")
     session_https_only: bool = os.getenv("SESSION_HTTPS_ONLY", "false").lower() == "true"
     upload_dir: str = os.getenv("UPLOAD_DIR", "/data/uploads")
     max_upload_mb: int = int(os.getenv("MAX_UPLOAD_MB", "20"))
+    upload_workers: int = int(os.getenv("UPLOAD_WORKERS", "4"))
+    download_accel_prefix: str = os.getenv("DOWNLOAD_ACCEL_PREFIX", "")
+    preview_dir: str = os.getenv("PREVIEW_DIR", "/data/previews")
+    preview_size: int = int(os.getenv("PREVIEW_SIZE", "320"))
+    preview_workers: int = int(os.getenv("PREVIEW_WORKERS", "2"))
+    storage_gc_delete: bool = os.getenv("STORAGE_GC_DELETE", "false").lower() == "true"
+    storage_gc_grace_hours: int = int(os.getenv("STORAGE_GC_GRACE_HOURS", "24"))
+    storage_gc_verify: bool = os.getenv("STORAGE_GC_VERIFY", "false").lower() == "true"
+    storage_gc_workers: int = int(os.getenv("STORAGE_GC_WORKERS", "4"))
 
     factorial_base_url: str = os.getenv("FACTORIAL_BASE_URL", "")
     factorial_api_token: str = os.getenv("FACTORIAL_API_TOKEN", "")
     factorial_company_id: str = os.getenv("FACTORIAL_COMPANY_ID", "")
     factorial_sync_cron: str = os.getenv("FACTORIAL_SYNC_CRON", "0 2 * * *")
+    slow_query_ms: int = int(os.getenv("SLOW_QUERY_MS", "500"))
+    settings_cache_seconds: int = int(os.getenv("SETTINGS_CACHE_SECONDS", "300"))
 
     smtp_host: str = os.getenv("SMTP_HOST", "")
     smtp_port: int = int(os.getenv("SMTP_PORT", "587"))
@@ -33,6 +48,14 @@ class Settings(BaseModel):
     webhook_url: str = os.getenv("WEBHOOK_URL", "")
     cors_origins: str = os.getenv("CORS_ORIGINS", "")
 
+    audit_buffer_enabled: bool = os.getenv("AUDIT_BUFFER_ENABLED", "false").lower() == "true"
+    audit_buffer_size: int = int(os.getenv("AUDIT_BUFFER_SIZE", "500"))
+    audit_flush_seconds: float = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+    audit_buffer_max: int = int(os.getenv("AUDIT_BUFFER_MAX", "50000"))
+    audit_flush_attempts: int = int(os.getenv("AUDIT_FLUSH_ATTEMPTS", "5"))
+    audit_retention_months: int = int(os.getenv("AUDIT_RETENTION_MONTHS", "24"))
+    audit_archive_dir: str = os.getenv("AUDIT_ARCHIVE_DIR", "/data/audit-archive")
+
     login_rate_limit_attempts: int = int(os.getenv("LOGIN_RATE_LIMIT_ATTEMPTS", "10"))
     login_rate_limit_window_seconds: int = int(os.getenv("LOGIN_RATE_LIMIT_WINDOW_SECONDS", "300"))
 
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", multiprocess_mode="livesum"
+)
+
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connections checked out of the pool", ["pool"])
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections currently checked out", ["pool"], multiprocess_mode="livesum"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size", ["pool"], multiprocess_mode="livesum"
+)
+
+JOB_DURATION = Histogram(
+    "scheduled_job_duration_seconds",
+    "Scheduled job run time",
+    ["job"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 900, 1800),
+)
+JOB_RUNS = Counter("scheduled_job_runs_total", "Scheduled job runs by outcome", ["job", "outcome"])
+
+ALERT_DISPATCH = Counter("alert_dispatch_total", "Alert notifications by channel and outcome", ["channel", "outcome"])
+AUDIT_DROPPED = Counter("audit_records_dropped_total", "Buffered audit entries dropped to the log", ["reason"])
+
+UPLOADS = Counter("uploads_total", "Uploaded files by outcome", ["outcome"])
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes received in accepted uploads")
+UPLOAD_DURATION = Histogram(
+    "upload_store_duration_seconds",
+    "Time to stream, hash and store one upload",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def _pool_name(pool: Pool) -> str:
+    return pool.logging_name or "default"
+
+
+class _InstrumentedPoolMixin:
+    def _record_usage(self) -> None:
+        name = _pool_name(self)
+        DB_POOL_IN_USE.labels(name).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(max(self.overflow(), 0))
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            name = _pool_name(self)
+            DB_POOL_CHECKOUT_WAIT.labels(name).observe(perf_counter() - started)
+            DB_POOL_CHECKOUTS.labels(name).inc()
+            self._record_usage()
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._record_usage()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+@contextmanager
+def track_job(name: str) -> Iterator[dict]:
+    run = {"outcome": "success"}
+    started = perf_counter()
+    try:
+        yield run
+    except Exception:
+        run["outcome"] = "error"
+        raise
+    finally:
+        JOB_DURATION.labels(name).observe(perf_counter() - started)
+        JOB_RUNS.labels(name, run["outcome"]).inc()
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
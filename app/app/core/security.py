@@ -1,15 +1,18 @@
 from passlib.context import CryptContext
 import secrets
+from app.core.timing import timed
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    with timed("hash"):
+        return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with timed("hash"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def generate_token(length: int = 32) -> str:
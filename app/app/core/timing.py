@@ -0,0 +1,142 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator
+import logging
+import re
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import get_settings
+from app.core.metrics import REQUESTS_IN_FLIGHT, observe_request
+
+access_logger = logging.getLogger("app.access")
+slow_query_logger = logging.getLogger("app.slow_query")
+
+_STRING_LITERAL = re.compile(r"'(?:''|[^'])*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|%s)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+|%s)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestTimings:
+    def __init__(self, scope: Scope) -> None:
+        self.scope = scope
+        self.started = perf_counter()
+        self.db_seconds = 0.0
+        self.db_statements = 0
+        self.spans: dict[str, float] = {}
+
+    @property
+    def route_template(self) -> str | None:
+        return getattr(self.scope.get("route"), "path", None)
+
+    @property
+    def route(self) -> str:
+        return self.route_template or self.scope.get("path", "")
+
+    def add_span(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        parts = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_statements} queries"']
+        parts.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.spans.items())
+        parts.append(f"total;dur={(perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(name, perf_counter() - started)
+
+
+def normalize_sql(statement: str) -> str:
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _VALUE_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()[:2000]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._query_started = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = perf_counter() - context._query_started
+    timings = _current.get()
+    if timings is not None:
+        timings.db_seconds += elapsed
+        timings.db_statements += 1
+    threshold_ms = get_settings().slow_query_ms
+    if threshold_ms > 0 and elapsed * 1000 >= threshold_ms:
+        slow_query_logger.warning(
+            "slow_query",
+            extra={
+                "duration_ms": round(elapsed * 1000, 1),
+                "statement": normalize_sql(statement),
+                "executemany": executemany,
+                "route": timings.route if timings else None,
+            },
+        )
+
+
+class TimingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope)
+        token = _current.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            REQUESTS_IN_FLIGHT.dec()
+            duration = perf_counter() - timings.started
+            # Unmatched paths (static files, 404 probes) share one label to keep series bounded.
+            observe_request(scope["method"], timings.route_template or "unmatched", status_code, duration)
+            access_logger.info(
+                "request",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": timings.route,
+                    "status": status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "db_ms": round(timings.db_seconds * 1000, 1),
+                    "db_statements": timings.db_statements,
+                    **{f"{name}_ms": round(seconds * 1000, 1) for name, seconds in timings.spans.items()},
+                },
+            )
@@ -1,16 +1,147 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import time
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import get_settings
+from app.core.metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
 
 
-def get_db():
+def _async_url(url: str) -> str:
+    if "+psycopg2" in url:
+        return url.replace("+psycopg2", "+asyncpg", 1)
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+
+engine = create_engine(
+    settings.database_url, pool_pre_ping=True, poolclass=InstrumentedQueuePool, pool_logging_name="primary"
+)
+read_engine = (
+    create_engine(
+        settings.database_read_url, pool_pre_ping=True, poolclass=InstrumentedQueuePool, pool_logging_name="replica"
+    )
+    if settings.database_read_url
+    else None
+)
+
+async_engine = create_async_engine(
+    settings.database_async_url or _async_url(settings.database_url),
+    pool_pre_ping=True,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_logging_name="primary_async",
+)
+async_read_engine = (
+    create_async_engine(
+        _async_url(settings.database_read_url),
+        pool_pre_ping=True,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_logging_name="replica_async",
+    )
+    if settings.database_read_url
+    else None
+)
+
+
+class ReplicaLagMonitor:
+    def __init__(self, max_lag_seconds: int) -> None:
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_seconds: float | None = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag_seconds is not None and self.lag_seconds <= self.max_lag_seconds
+
+    def refresh(self, bind: Engine) -> None:
+        try:
+            with bind.connect() as conn:
+                self.lag_seconds = float(conn.execute(REPLICA_LAG_SQL).scalar() or 0)
+        except Exception:
+            logger.warning("Replica lag check failed, routing reads to primary", exc_info=True)
+            self.lag_seconds = None
+
+
+replica_lag = ReplicaLagMonitor(settings.replica_max_lag_seconds)
+
+
+class RoutingSession(Session):
+    primary: Engine = engine
+    replica: Engine | None = read_engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.replica is None
+            or self._flushing
+            or isinstance(clause, UpdateBase)
+            or not self.info.get("read_only")
+            or self.info.get("wrote")
+            or not replica_lag.healthy
+        ):
+            return self.primary
+        return self.replica
+
+
+class AsyncRoutingSession(RoutingSession):
+    primary = async_engine.sync_engine
+    replica = async_read_engine.sync_engine if async_read_engine else None
+
+
+def _mark_wrote(session: Session) -> None:
+    session.info["wrote"] = True
+    http_session = session.info.get("http_session")
+    if http_session is not None:
+        http_session["db_wrote_at"] = int(time.time())
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, _flush_context):
+    _mark_wrote(session)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _after_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_wrote(orm_execute_state.session)
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False
+)
+
+
+def _route_request(db_info: dict, request: Request) -> None:
+    # Reads stay on the primary for a while after this browser session wrote,
+    # so a redirect after a POST never shows stale data from the replica.
+    window = settings.replica_max_lag_seconds + settings.replica_lag_check_seconds
+    wrote_at = request.session.get("db_wrote_at", 0)
+    db_info["http_session"] = request.session
+    db_info["read_only"] = request.method in {"GET", "HEAD"} and time.time() - wrote_at > window
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    _route_request(db.info, request)
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        _route_request(db.info, request)
+        yield db
@@ -2,18 +2,22 @@ from contextlib import asynccontextmanager
 import logging
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, Response
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from app.core.config import get_settings
 from app.core.logging import configure_logging
+from app.core.metrics import mark_worker_dead, render_metrics
+from app.core.timing import TimingMiddleware
 from app.db.session import SessionLocal
 from app.models import User
 from app.core.security import hash_password
 from app.api.web import router as web_router
 from app.api.rest import router as api_router
 from app.services.scheduler import start_scheduler, shutdown_scheduler
+from app.services.audit import start_audit_writer, stop_audit_writer
+from app.services.settings_store import start_settings_listener, stop_settings_listener
 
 configure_logging()
 logger = logging.getLogger(__name__)
@@ -39,9 +43,14 @@ async def lifespan(_: FastAPI):
     finally:
         db.close()
 
+    start_audit_writer()
+    start_settings_listener()
     start_scheduler()
     yield
     shutdown_scheduler()
+    stop_settings_listener()
+    stop_audit_writer()
+    mark_worker_dead()
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
@@ -62,6 +71,8 @@ if settings.cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(TimingMiddleware)
+
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.include_router(web_router)
 app.include_router(api_router)
@@ -82,3 +93,9 @@ def health():
         return JSONResponse({"status": "ok"})
     finally:
         db.close()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    payload, content_type = render_metrics()
+    return Response(payload, media_type=content_type)
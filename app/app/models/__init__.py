@@ -5,11 +5,15 @@ from app.models.models import (
     Course,
     EmployeeCourse,
     EmployeeCourseUpdate,
+    Blob,
     Attachment,
     CourseUpdateAttachment,
     AlertSetting,
     AlertLog,
     Setting,
+    TableVersion,
+    ChangeLog,
+    ComplianceSnapshot,
     AuditLog,
 )
 
@@ -20,10 +24,14 @@ __all__ = [
     "Course",
     "EmployeeCourse",
     "EmployeeCourseUpdate",
+    "Blob",
     "Attachment",
     "CourseUpdateAttachment",
     "AlertSetting",
     "AlertLog",
     "Setting",
+    "TableVersion",
+    "ChangeLog",
+    "ComplianceSnapshot",
     "AuditLog",
 ]
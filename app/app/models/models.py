@@ -2,13 +2,17 @@ from datetime import datetime, date, UTC
 from sqlalchemy import (
     String,
     Integer,
+    BigInteger,
     Date,
     DateTime,
     Boolean,
     ForeignKey,
     Text,
     UniqueConstraint,
+    Index,
+    Sequence,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
@@ -41,6 +45,9 @@ class Employee(Base):
     last_synced_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
+    )
 
     certifications = relationship("Certification", back_populates="employee")
     employee_courses = relationship("EmployeeCourse", back_populates="employee", cascade="all, delete-orphan")
@@ -89,7 +96,10 @@ class Course(Base):
 
 class EmployeeCourse(Base):
     __tablename__ = "employee_courses"
-    __table_args__ = (UniqueConstraint("employee_id", "course_id", name="uq_employee_course"),)
+    __table_args__ = (
+        UniqueConstraint("employee_id", "course_id", name="uq_employee_course"),
+        Index("ix_employee_courses_course_due", "course_id", "next_refresh_due_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id", ondelete="CASCADE"), index=True)
@@ -120,6 +130,7 @@ class EmployeeCourseUpdate(Base):
     )
     update_date: Mapped[date] = mapped_column(Date, index=True)
     next_refresh_due_date: Mapped[date | None] = mapped_column(Date, nullable=True, index=True)
+    due_date_manual: Mapped[bool] = mapped_column(Boolean, default=False)
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -132,22 +143,36 @@ class EmployeeCourseUpdate(Base):
     )
 
 
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    stored_path: Mapped[str] = mapped_column(String(500), unique=True)
+    mime_type: Mapped[str] = mapped_column(String(120))
+    file_size: Mapped[int] = mapped_column(BigInteger)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC)
+    )
+
+
 class Attachment(Base):
     __tablename__ = "attachments"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     certification_id: Mapped[int] = mapped_column(ForeignKey("certifications.id", ondelete="CASCADE"))
     original_filename: Mapped[str] = mapped_column(String(255))
-    stored_path: Mapped[str] = mapped_column(String(500), unique=True)
+    stored_path: Mapped[str] = mapped_column(String(500))
     mime_type: Mapped[str] = mapped_column(String(120))
     file_size: Mapped[int] = mapped_column(Integer)
-    checksum_sha256: Mapped[str] = mapped_column(String(64), index=True)
+    checksum_sha256: Mapped[str] = mapped_column(ForeignKey("blobs.sha256"), index=True)
     uploaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
     )
     uploaded_by: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
 
     certification = relationship("Certification", back_populates="attachments")
+    blob = relationship("Blob")
 
 
 class CourseUpdateAttachment(Base):
@@ -158,16 +183,17 @@ class CourseUpdateAttachment(Base):
         ForeignKey("employee_course_updates.id", ondelete="CASCADE"), index=True
     )
     original_filename: Mapped[str] = mapped_column(String(255))
-    stored_path: Mapped[str] = mapped_column(String(500), unique=True)
+    stored_path: Mapped[str] = mapped_column(String(500))
     mime_type: Mapped[str] = mapped_column(String(120))
     file_size: Mapped[int] = mapped_column(Integer)
-    checksum_sha256: Mapped[str] = mapped_column(String(64), index=True)
+    checksum_sha256: Mapped[str] = mapped_column(ForeignKey("blobs.sha256"), index=True)
     uploaded_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
     )
     uploaded_by: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
 
     course_update = relationship("EmployeeCourseUpdate", back_populates="attachments")
+    blob = relationship("Blob")
 
 
 class AlertSetting(Base):
@@ -198,13 +224,53 @@ class Setting(Base):
     value: Mapped[str] = mapped_column(Text, default="")
 
 
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC)
+    )
+
+
+class ComplianceSnapshot(Base):
+    __tablename__ = "compliance_snapshots"
+    __table_args__ = (Index("ix_compliance_snapshots_location_date", "location", "snapshot_date"),)
+
+    snapshot_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    location: Mapped[str] = mapped_column(String(120), primary_key=True)
+    cost_center: Mapped[str] = mapped_column(String(120), primary_key=True)
+    cert_type: Mapped[str] = mapped_column(String(120), primary_key=True)
+    certs_valid: Mapped[int] = mapped_column(Integer, default=0)
+    certs_expiring: Mapped[int] = mapped_column(Integer, default=0)
+    certs_expired: Mapped[int] = mapped_column(Integer, default=0)
+    courses_due_soon: Mapped[int] = mapped_column(Integer, default=0)
+    courses_overdue: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    txid: Mapped[int] = mapped_column(BigInteger)
+    entity: Mapped[str] = mapped_column(String(40))
+    entity_id: Mapped[int] = mapped_column(Integer)
+    op: Mapped[str] = mapped_column(String(10))
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC)
+    )
+
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id: Mapped[int] = mapped_column(BigInteger, Sequence("audit_log_seq"), primary_key=True)
     actor_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
     action: Mapped[str] = mapped_column(String(120))
     entity: Mapped[str] = mapped_column(String(120))
     entity_id: Mapped[str] = mapped_column(String(120))
-    metadata_json: Mapped[str] = mapped_column(Text, default="{}")
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    meta: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(UTC)
+    )
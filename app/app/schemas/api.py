@@ -1,6 +1,12 @@
 from datetime import date
+from typing import Literal
 from pydantic import BaseModel, Field
 
+CertificationField = Literal[
+    "id", "cert_type", "title", "provider", "issued_date", "expiry_date", "notes", "status", "updated_at"
+]
+DEFAULT_CERTIFICATION_FIELDS = ["id", "cert_type", "title", "provider", "issued_date", "expiry_date", "status"]
+
 
 class CertificationCreate(BaseModel):
     cert_type: str = Field(min_length=2, max_length=120)
@@ -11,6 +17,21 @@ class CertificationCreate(BaseModel):
     notes: str | None = None
 
 
+class CertificationBatchRequest(BaseModel):
+    employee_ids: list[int] = Field(min_length=1, max_length=5000)
+    fields: list[CertificationField] = Field(default_factory=lambda: list(DEFAULT_CERTIFICATION_FIELDS), min_length=1)
+    as_of: date | None = None
+
+
+class BulkAssignmentRequest(BaseModel):
+    employee_ids: list[int] | None = Field(default=None, max_length=20000)
+    location: str = ""
+    cost_center: str = ""
+    active: bool | None = True
+    completed_date: date | None = None
+    notes: str | None = None
+
+
 class SettingsUpdate(BaseModel):
     factorial_base_url: str = ""
     factorial_api_token: str = ""
@@ -6,8 +6,10 @@ import httpx
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from app.core.config import get_settings
-from app.models import Certification, AlertLog, AlertSetting, User
+from app.core.metrics import ALERT_DISPATCH
+from app.models import Certification, AlertLog, User
 from app.services.certifications import status_for_expiry
+from app.services.settings_store import get_settings_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -21,13 +23,6 @@ def _parse_thresholds(csv_text: str) -> list[int]:
     return sorted(set(vals), reverse=True)
 
 
-def _setting_for_cert(db: Session, cert_type: str) -> AlertSetting | None:
-    row = db.query(AlertSetting).filter_by(cert_type=cert_type).first()
-    if row:
-        return row
-    return db.query(AlertSetting).filter(AlertSetting.cert_type.is_(None)).first()
-
-
 def _admin_emails(db: Session) -> list[str]:
     return [u.email for u in db.query(User).filter_by(role="admin", is_active=True).all() if u.email]
 
@@ -53,19 +48,29 @@ def _send_email(recipients: list[str], subject: str, body: str, smtp_cfg: dict)
     msg["To"] = ", ".join(recipients)
     msg.set_content(body)
 
-    with smtplib.SMTP(smtp_cfg["host"], smtp_cfg["port"], timeout=10) as server:
-        if smtp_cfg["tls"]:
-            server.starttls()
-        if smtp_cfg.get("user"):
-            server.login(smtp_cfg["user"], smtp_cfg["password"])
-        server.send_message(msg)
+    try:
+        with smtplib.SMTP(smtp_cfg["host"], smtp_cfg["port"], timeout=10) as server:
+            if smtp_cfg["tls"]:
+                server.starttls()
+            if smtp_cfg.get("user"):
+                server.login(smtp_cfg["user"], smtp_cfg["password"])
+            server.send_message(msg)
+    except Exception:
+        ALERT_DISPATCH.labels("email", "failed").inc()
+        raise
+    ALERT_DISPATCH.labels("email", "sent").inc()
 
 
 def _send_webhook(url: str, payload: dict) -> None:
     if not url:
         return
-    with httpx.Client(timeout=10.0) as client:
-        client.post(url, json=payload)
+    try:
+        with httpx.Client(timeout=10.0) as client:
+            response = client.post(url, json=payload)
+    except Exception:
+        ALERT_DISPATCH.labels("webhook", "failed").inc()
+        raise
+    ALERT_DISPATCH.labels("webhook", "sent" if response.is_success else "failed").inc()
 
 
 def run_alerts(db: Session) -> dict:
@@ -76,24 +81,20 @@ def run_alerts(db: Session) -> dict:
     sent_count = 0
     smtp_cfg = _smtp_config(db)
     settings = get_settings()
+    snapshot = get_settings_snapshot()
+    admin_emails = _admin_emails(db)
 
     for cert in certs:
         status = status_for_expiry(cert.expiry_date)
         days_left = (cert.expiry_date - today).days
 
-        rule = _setting_for_cert(db, cert.cert_type)
-        if not rule:
-            thresholds = [90, 60, 30, 14, 7, 1]
-            email_enabled = True
-            webhook_enabled = False
-            recipients = []
-        else:
-            thresholds = _parse_thresholds(rule.thresholds_csv)
-            email_enabled = rule.email_enabled
-            webhook_enabled = rule.webhook_enabled
-            recipients = [x.strip() for x in rule.recipient_emails.split(",") if x.strip()]
-
-        recipients = sorted(set(recipients + _admin_emails(db)))
+        rule = snapshot.rule_for(cert.cert_type)
+        thresholds = _parse_thresholds(rule.thresholds_csv)
+        email_enabled = rule.email_enabled
+        webhook_enabled = rule.webhook_enabled
+        recipients = [x.strip() for x in rule.recipient_emails.split(",") if x.strip()]
+
+        recipients = sorted(set(recipients + admin_emails))
 
         for threshold in thresholds:
             if days_left == threshold or (status == "expired" and threshold == 1):
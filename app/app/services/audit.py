@@ -1,7 +1,129 @@
-import json
+from datetime import datetime, UTC
+import logging
+import threading
+from sqlalchemy import event, insert
 from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.metrics import AUDIT_DROPPED
+from app.db.session import SessionLocal
 from app.models import AuditLog
 
+logger = logging.getLogger(__name__)
+dead_letter_logger = logging.getLogger("app.audit.dead_letter")
+
+
+def _insert_batch(records: list[dict]) -> bool:
+    db = SessionLocal()
+    try:
+        db.execute(insert(AuditLog), records)
+        db.commit()
+        return True
+    except Exception:
+        logger.exception("Audit flush failed, batch requeued", extra={"count": len(records)})
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+# Dropped entries are written to the log so they can still be recovered from the log pipeline.
+def _dead_letter(records: list[dict], reason: str) -> None:
+    AUDIT_DROPPED.labels(reason).inc(len(records))
+    dead_letter_logger.error("audit_dead_letter", extra={"reason": reason, "count": len(records), "records": records})
+
+
+class AuditBuffer:
+    def __init__(self, batch_size: int, interval_seconds: float, max_records: int, max_attempts: int) -> None:
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_records = max_records
+        self.max_attempts = max_attempts
+        self._records: list[tuple[int, dict]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, records: list[dict]) -> None:
+        with self._lock:
+            self._records.extend((0, record) for record in records)
+            overflow = max(len(self._records) - self.max_records, 0)
+            dropped = self._records[:overflow]
+            del self._records[:overflow]
+            full = len(self._records) >= self.batch_size
+        if dropped:
+            _dead_letter([record for _, record in dropped], "overflow")
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._lock:
+            queued, self._records = self._records, []
+        written = 0
+        retry: list[tuple[int, dict]] = []
+        for start in range(0, len(queued), self.batch_size):
+            batch = queued[start : start + self.batch_size]
+            if _insert_batch([record for _, record in batch]):
+                written += len(batch)
+                continue
+            expired = [record for attempts, record in batch if attempts + 1 >= self.max_attempts]
+            retry.extend((attempts + 1, record) for attempts, record in batch if attempts + 1 < self.max_attempts)
+            if expired:
+                _dead_letter(expired, "failed")
+        if retry:
+            with self._lock:
+                self._records[:0] = retry
+        return written
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.flush()
+        with self._lock:
+            remaining, self._records = self._records, []
+        if remaining:
+            _dead_letter([record for _, record in remaining], "shutdown")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            self.flush()
+
+
+_settings = get_settings()
+audit_buffer = (
+    AuditBuffer(
+        _settings.audit_buffer_size,
+        _settings.audit_flush_seconds,
+        _settings.audit_buffer_max,
+        _settings.audit_flush_attempts,
+    )
+    if _settings.audit_buffer_enabled
+    else None
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _release_pending_audit(session: Session) -> None:
+    records = session.info.pop("pending_audit", None)
+    if records and audit_buffer is not None:
+        audit_buffer.add(records)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_audit(session: Session) -> None:
+    session.info.pop("pending_audit", None)
+
 
 def write_audit(
     db: Session,
@@ -11,12 +133,25 @@ def write_audit(
     entity_id: str,
     metadata: dict | None = None,
 ) -> None:
-    log = AuditLog(
-        actor_user_id=actor_user_id,
-        action=action,
-        entity=entity,
-        entity_id=entity_id,
-        metadata_json=json.dumps(metadata or {}),
-    )
-    db.add(log)
-    db.commit()
+    record = {
+        "actor_user_id": actor_user_id,
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "meta": metadata or {},
+        "created_at": datetime.now(UTC),
+    }
+    if audit_buffer is not None:
+        db.info.setdefault("pending_audit", []).append(record)
+    else:
+        db.add(AuditLog(**record))
+
+
+def start_audit_writer() -> None:
+    if audit_buffer is not None:
+        audit_buffer.start()
+
+
+def stop_audit_writer() -> None:
+    if audit_buffer is not None:
+        audit_buffer.stop()
@@ -0,0 +1,92 @@
+from datetime import date
+from pathlib import Path
+import gzip
+import logging
+import os
+import re
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PARTITION_RE = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_month(name: str) -> date | None:
+    match = PARTITION_RE.match(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def ensure_audit_partitions(db: Session, months_ahead: int = 2) -> list[str]:
+    current = date.today().replace(day=1)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        upper = add_months(month, 1)
+        name = f"audit_logs_{month:%Y_%m}"
+        exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists:
+            continue
+        db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF audit_logs "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+            )
+        )
+        created.append(name)
+    db.commit()
+    return created
+
+
+def archive_audit_partitions(db: Session, retention_months: int, archive_dir: str) -> list[str]:
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    rows = db.execute(
+        text(
+            "SELECT c.relname, c.relispartition FROM pg_class c "
+            "WHERE c.relkind = 'r' AND c.relname LIKE 'audit\\_logs\\_%'"
+        )
+    ).all()
+    candidates = sorted(
+        (name, attached) for name, attached in rows if (month := _partition_month(name)) and month < cutoff
+    )
+
+    folder = Path(archive_dir)
+    folder.mkdir(parents=True, exist_ok=True)
+    archived = []
+    for name, attached in candidates:
+        if attached:
+            db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+            db.commit()
+
+        target = folder / f"{name}.csv.gz"
+        tmp = folder / f".{name}.csv.gz.tmp"
+        cursor = db.connection().connection.cursor()
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+                cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", fh)
+        finally:
+            cursor.close()
+        os.replace(tmp, target)
+
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        archived.append(name)
+        logger.info("audit_partition_archived", extra={"partition": name, "path": str(target)})
+    return archived
+
+
+def run_audit_maintenance(db: Session) -> dict:
+    settings = get_settings()
+    created = ensure_audit_partitions(db)
+    archived = archive_audit_partitions(db, settings.audit_retention_months, settings.audit_archive_dir)
+    return {"created": created, "archived": archived}
@@ -0,0 +1,182 @@
+from datetime import datetime, UTC
+from typing import BinaryIO, Iterator
+import codecs
+import csv
+import json
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.models import Certification, Employee
+from app.schemas.api import CertificationCreate
+from app.services.audit import write_audit
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+OPTIONAL_FIELDS = ("provider", "issued_date", "notes")
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _decode_line(line_no: int, line: bytes) -> str:
+    if line_no == 1:
+        line = line.removeprefix(codecs.BOM_UTF8)
+    return line.decode("utf-8")
+
+
+def _iter_csv(stream: BinaryIO) -> Iterator[tuple[int, dict | ImportRowError]]:
+    line_no = 0
+
+    def lines() -> Iterator[str]:
+        nonlocal line_no
+        for line_no, line in enumerate(stream, start=1):
+            yield _decode_line(line_no, line)
+
+    # A broken line can leave the reader inside a quoted field, so the file is rejected instead of skipping it.
+    try:
+        reader = csv.reader(lines())
+        header = [key.strip() for key in next(reader, [])]
+        start = reader.line_num + 1
+        for values in reader:
+            if values:
+                yield start, {key: value.strip() for key, value in zip(header, values) if key}
+            start = reader.line_num + 1
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail=f"Line {line_no}: not valid UTF-8")
+    except csv.Error as exc:
+        raise HTTPException(status_code=400, detail=f"Line {line_no}: {exc}")
+
+
+def _iter_ndjson(stream: BinaryIO) -> Iterator[tuple[int, dict | ImportRowError]]:
+    for line_no, raw in enumerate(stream, start=1):
+        try:
+            line = _decode_line(line_no, raw)
+        except UnicodeDecodeError:
+            yield line_no, ImportRowError("not valid UTF-8")
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, ImportRowError(f"invalid JSON: {exc.msg}")
+            continue
+        yield line_no, row if isinstance(row, dict) else ImportRowError("expected a JSON object")
+
+
+def detect_format(filename: str, content_type: str | None) -> str:
+    name = filename.lower()
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+def _employee_lookup(db: Session) -> tuple[dict[str, int], dict[str, int]]:
+    by_factorial: dict[str, int] = {}
+    by_email: dict[str, int] = {}
+    for employee_id, factorial_id, email in db.execute(
+        select(Employee.id, Employee.factorial_employee_id, Employee.email)
+    ):
+        by_factorial[factorial_id] = employee_id
+        if email:
+            by_email.setdefault(email.strip().lower(), employee_id)
+    return by_factorial, by_email
+
+
+def _resolve_employee(row: dict, by_factorial: dict[str, int], by_email: dict[str, int]) -> int:
+    factorial_id = str(row.get("factorial_employee_id") or "").strip()
+    email = str(row.get("employee_email") or row.get("email") or "").strip().lower()
+    if factorial_id:
+        if factorial_id not in by_factorial:
+            raise ImportRowError(f"unknown factorial_employee_id {factorial_id}")
+        return by_factorial[factorial_id]
+    if email:
+        if email not in by_email:
+            raise ImportRowError(f"unknown employee email {email}")
+        return by_email[email]
+    raise ImportRowError("factorial_employee_id or employee_email is required")
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors())
+
+
+def import_certifications(
+    db: Session,
+    stream: BinaryIO,
+    fmt: str,
+    actor_user_id: int,
+    filename: str = "",
+    strict: bool = False,
+) -> dict:
+    by_factorial, by_email = _employee_lookup(db)
+    rows = _iter_ndjson(stream) if fmt == "ndjson" else _iter_csv(stream)
+    now = datetime.now(UTC)
+
+    batch: list[dict] = []
+    errors: list[dict] = []
+    error_count = 0
+    inserted = 0
+    total = 0
+    try:
+        for line_no, raw in rows:
+            total += 1
+            try:
+                if isinstance(raw, ImportRowError):
+                    raise raw
+                employee_id = _resolve_employee(raw, by_factorial, by_email)
+                data = {key: value for key, value in raw.items() if key in CertificationCreate.model_fields}
+                for key in OPTIONAL_FIELDS:
+                    if data.get(key) == "":
+                        data[key] = None
+                cert = CertificationCreate.model_validate(data)
+            except ValidationError as exc:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "error": _validation_message(exc)})
+                continue
+            except ImportRowError as exc:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "error": str(exc)})
+                continue
+
+            if strict and error_count:
+                continue
+            batch.append(
+                {
+                    **cert.model_dump(),
+                    "employee_id": employee_id,
+                    "created_by": actor_user_id,
+                    "updated_by": actor_user_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                db.execute(insert(Certification), batch)
+                inserted += len(batch)
+                batch = []
+    except HTTPException:
+        db.rollback()
+        raise
+
+    if strict and error_count:
+        db.rollback()
+        return {"ok": False, "total": total, "inserted": 0, "failed": error_count, "errors": errors}
+
+    if batch:
+        db.execute(insert(Certification), batch)
+        inserted += len(batch)
+    write_audit(
+        db,
+        actor_user_id,
+        "import",
+        "certification",
+        "bulk",
+        {"filename": filename, "format": fmt, "total": total, "inserted": inserted, "failed": error_count},
+    )
+    db.commit()
+    return {"ok": True, "total": total, "inserted": inserted, "failed": error_count, "errors": errors}
@@ -1,11 +1,42 @@
-from datetime import date
+from datetime import date, timedelta
+from sqlalchemy import Select, false
+from app.models import Certification, Employee
 
+EXPIRING_DAYS = 30
 
-def status_for_expiry(expiry_date: date) -> str:
-    today = date.today()
+
+def status_for_expiry(expiry_date: date, today: date | None = None) -> str:
+    today = today or date.today()
     if expiry_date < today:
         return "expired"
     days = (expiry_date - today).days
-    if days <= 30:
+    if days <= EXPIRING_DAYS:
         return "expiring"
     return "valid"
+
+
+def filter_certifications(
+    stmt: Select,
+    today: date,
+    cert_type: str = "",
+    status: str = "",
+    location: str = "",
+    expires_within_days: int = 0,
+) -> Select:
+    if cert_type:
+        stmt = stmt.where(Certification.cert_type == cert_type)
+    if location:
+        stmt = stmt.where(Employee.location == location)
+    if expires_within_days > 0:
+        stmt = stmt.where(Certification.expiry_date <= today + timedelta(days=expires_within_days))
+    if status:
+        expiring_limit = today + timedelta(days=EXPIRING_DAYS)
+        if status == "expired":
+            stmt = stmt.where(Certification.expiry_date < today)
+        elif status == "expiring":
+            stmt = stmt.where(Certification.expiry_date.between(today, expiring_limit))
+        elif status == "valid":
+            stmt = stmt.where(Certification.expiry_date > expiring_limit)
+        else:
+            stmt = stmt.where(false())
+    return stmt
@@ -0,0 +1,89 @@
+import base64
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, literal, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Attachment, Certification, ChangeLog, Course, Employee, EmployeeCourse
+
+FEED_ENTITIES = {
+    "employee": (
+        Employee,
+        ("factorial_employee_id", "first_name", "last_name", "email", "location", "cost_center", "is_active"),
+    ),
+    "certification": (
+        Certification,
+        ("employee_id", "cert_type", "title", "provider", "issued_date", "expiry_date", "notes"),
+    ),
+    "course": (
+        Course,
+        ("title", "description", "provider", "requires_refresh", "refresh_interval_days", "is_active"),
+    ),
+    "employee_course": (
+        EmployeeCourse,
+        ("employee_id", "course_id", "completed_date", "next_refresh_due_date", "notes"),
+    ),
+    "attachment": (
+        Attachment,
+        ("certification_id", "original_filename", "mime_type", "file_size", "checksum_sha256", "uploaded_at"),
+    ),
+}
+
+# Only changes from transactions older than every in-flight one are served, so a late commit is never skipped.
+SNAPSHOT_XMIN = text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def encode_change_cursor(txid: int, seq: int) -> str:
+    return base64.urlsafe_b64encode(f"{txid}.{seq}".encode()).decode()
+
+
+def decode_change_cursor(cursor: str) -> tuple[int, int]:
+    if not cursor:
+        return 0, 0
+    try:
+        txid, seq = base64.urlsafe_b64decode(cursor.encode()).decode().split(".")
+        return int(txid), int(seq)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def read_changes(db: AsyncSession, since: str, limit: int) -> dict:
+    txid, seq = decode_change_cursor(since)
+    stmt = (
+        select(ChangeLog)
+        .where(
+            tuple_(ChangeLog.txid, ChangeLog.seq) > tuple_(literal(txid, BigInteger), literal(seq, BigInteger)),
+            ChangeLog.txid < SNAPSHOT_XMIN,
+        )
+        .order_by(ChangeLog.txid, ChangeLog.seq)
+        .limit(limit + 1)
+    )
+    rows = (await db.scalars(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest: dict[tuple[str, int], str] = {}
+    for row in rows:
+        if row.entity not in FEED_ENTITIES:
+            continue
+        latest.pop((row.entity, row.entity_id), None)
+        latest[(row.entity, row.entity_id)] = row.op
+
+    current: dict[str, dict[int, object]] = {}
+    for entity, (model, _) in FEED_ENTITIES.items():
+        ids = [entity_id for (name, entity_id), op in latest.items() if name == entity and op == "upsert"]
+        if ids:
+            found = (await db.scalars(select(model).where(model.id.in_(ids)))).all()
+            current[entity] = {obj.id: obj for obj in found}
+
+    changes = []
+    for (entity, entity_id), op in latest.items():
+        obj = current.get(entity, {}).get(entity_id) if op == "upsert" else None
+        if obj is None:
+            changes.append({"entity": entity, "id": entity_id, "op": "delete"})
+            continue
+        fields = FEED_ENTITIES[entity][1]
+        changes.append(
+            {"entity": entity, "id": entity_id, "op": "upsert", "data": {name: getattr(obj, name) for name in fields}}
+        )
+
+    next_cursor = encode_change_cursor(rows[-1].txid, rows[-1].seq) if rows else since
+    return {"changes": changes, "next_cursor": next_cursor, "has_more": has_more}
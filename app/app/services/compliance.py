@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Iterator
+import threading
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from app.models import Course, TableVersion
+from app.services.exports import iter_csv
+
+MATRIX_TABLES = ("employees", "courses", "employee_courses", "employee_course_updates")
+CELL_STATES = ("missing", "ok", "due-soon", "overdue")
+DUE_SOON_DAYS = 30
+
+MATRIX_SQL = text(
+    """
+    SELECT e.id, e.first_name, e.last_name, e.location, e.cost_center,
+           array_agg(
+               CASE
+                   WHEN ec.id IS NULL THEN 'missing'
+                   WHEN ec.next_refresh_due_date IS NULL AND ec.completed_date IS NULL THEN 'missing'
+                   WHEN ec.next_refresh_due_date < :today THEN 'overdue'
+                   WHEN ec.next_refresh_due_date <= :due_soon THEN 'due-soon'
+                   ELSE 'ok'
+               END
+               ORDER BY c.title, c.id
+           ) AS states
+    FROM employees e
+    CROSS JOIN courses c
+    LEFT JOIN employee_courses ec ON ec.employee_id = e.id AND ec.course_id = c.id
+    WHERE e.is_active AND c.is_active
+      AND (:location = '' OR e.location = :location)
+      AND (:cost_center = '' OR e.cost_center = :cost_center)
+    GROUP BY e.id
+    ORDER BY e.last_name, e.first_name, e.id
+    """
+)
+
+
+class MatrixCache:
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[tuple, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, stamp: tuple) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, stamp: tuple, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+matrix_cache = MatrixCache()
+
+
+def _matrix_stamp(db: Session, today: date) -> tuple:
+    rows = db.execute(
+        select(TableVersion.table_name, TableVersion.version).where(TableVersion.table_name.in_(MATRIX_TABLES))
+    ).all()
+    return (today, tuple(sorted(rows)))
+
+
+def _read_matrix(db: Session, params: dict) -> tuple[list, list]:
+    # Both reads share one REPEATABLE READ snapshot, so the course columns always match the state arrays.
+    with db.get_bind().connect() as conn:
+        conn.execution_options(isolation_level="REPEATABLE READ")
+        with conn.begin():
+            courses = conn.execute(
+                select(Course.id, Course.title).where(Course.is_active.is_(True)).order_by(Course.title, Course.id)
+            ).all()
+            rows = conn.execute(MATRIX_SQL, params).all()
+    return courses, rows
+
+
+def build_compliance_matrix(db: Session, location: str = "", cost_center: str = "") -> dict:
+    today = date.today()
+    key = (location, cost_center)
+    stamp = _matrix_stamp(db, today)
+    cached = matrix_cache.get(key, stamp)
+    if cached is not None:
+        return cached
+
+    params = {
+        "today": today,
+        "due_soon": today + timedelta(days=DUE_SOON_DAYS),
+        "location": location,
+        "cost_center": cost_center,
+    }
+    courses, rows = _read_matrix(db, params)
+
+    totals = [dict.fromkeys(CELL_STATES, 0) for _ in courses]
+    employees = []
+    for employee_id, first_name, last_name, emp_location, emp_cost_center, states in rows:
+        for index, state in enumerate(states):
+            totals[index][state] += 1
+        employees.append(
+            {
+                "id": employee_id,
+                "name": f"{first_name} {last_name}",
+                "location": emp_location,
+                "cost_center": emp_cost_center,
+                "states": states,
+            }
+        )
+
+    result = {
+        "as_of": today.isoformat(),
+        "filters": {"location": location, "cost_center": cost_center},
+        "courses": [
+            {"id": course_id, "title": title, "totals": totals[index]}
+            for index, (course_id, title) in enumerate(courses)
+        ],
+        "employees": employees,
+    }
+    matrix_cache.put(key, stamp, result)
+    return result
+
+
+def iter_compliance_csv(matrix: dict) -> Iterator[str]:
+    header = ["employee_id", "employee", "location", "cost_center", *(c["title"] for c in matrix["courses"])]
+    rows = (
+        [e["id"], e["name"], e["location"] or "", e["cost_center"] or "", *e["states"]] for e in matrix["employees"]
+    )
+    return iter_csv(header, rows)
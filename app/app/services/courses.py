@@ -0,0 +1,172 @@
+from datetime import date, datetime, timedelta, UTC
+from sqlalchemy import Date, DateTime, Integer, Text, and_, any_, bindparam, case, func, literal, null, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models import Course, Employee, EmployeeCourse
+from app.services.audit import write_audit
+
+
+def compute_next_refresh_due(base_date: date | None, interval_days: int | None) -> date | None:
+    if not base_date or not interval_days or interval_days <= 0:
+        return None
+    return base_date + timedelta(days=interval_days)
+
+
+def course_statistics(db: Session, today: date | None = None, due_soon_days: int = 30) -> list[dict]:
+    today = today or date.today()
+    due = EmployeeCourse.next_refresh_due_date
+    due_soon_limit = today + timedelta(days=due_soon_days)
+    stmt = (
+        select(
+            Course,
+            func.count(EmployeeCourse.id).label("assigned"),
+            func.count(EmployeeCourse.completed_date).label("completed"),
+            func.count(EmployeeCourse.id).filter(due.between(today, due_soon_limit)).label("due_soon"),
+            func.count(EmployeeCourse.id).filter(due < today).label("overdue"),
+        )
+        .outerjoin(EmployeeCourse, EmployeeCourse.course_id == Course.id)
+        .group_by(Course.id)
+        .order_by(Course.title.asc())
+    )
+    return [
+        {"course": course, "assigned": assigned, "completed": completed, "due_soon": due_soon, "overdue": overdue}
+        for course, assigned, completed, due_soon, overdue in db.execute(stmt)
+    ]
+
+
+def _employee_filters(
+    employee_ids: list[int] | None, location: str, cost_center: str, active: bool | None
+) -> list:
+    filters = []
+    if employee_ids:
+        filters.append(Employee.id == any_(bindparam("employee_ids", employee_ids, type_=ARRAY(Integer))))
+    if location:
+        filters.append(Employee.location == location)
+    if cost_center:
+        filters.append(Employee.cost_center == cost_center)
+    if active is not None:
+        filters.append(Employee.is_active == active)
+    return filters
+
+
+def bulk_assign_course(
+    db: Session,
+    course: Course,
+    actor_user_id: int,
+    employee_ids: list[int] | None = None,
+    location: str = "",
+    cost_center: str = "",
+    active: bool | None = True,
+    completed_date: date | None = None,
+    notes: str | None = None,
+) -> dict:
+    filters = _employee_filters(employee_ids, location, cost_center, active)
+    completed = literal(completed_date, Date)
+    next_due = case(
+        (and_(Course.requires_refresh, Course.refresh_interval_days > 0), completed + Course.refresh_interval_days),
+        else_=null(),
+    )
+    now = datetime.now(UTC)
+    source = (
+        select(
+            Employee.id,
+            Course.id,
+            completed,
+            next_due,
+            literal(notes, Text),
+            literal(actor_user_id, Integer),
+            literal(actor_user_id, Integer),
+            literal(now, DateTime(timezone=True)),
+            literal(now, DateTime(timezone=True)),
+        )
+        .select_from(Employee)
+        .join(Course, Course.id == course.id)
+        .where(*filters)
+    )
+    stmt = (
+        pg_insert(EmployeeCourse)
+        .from_select(
+            [
+                "employee_id",
+                "course_id",
+                "completed_date",
+                "next_refresh_due_date",
+                "notes",
+                "created_by",
+                "updated_by",
+                "created_at",
+                "updated_at",
+            ],
+            source,
+        )
+        .on_conflict_do_nothing(constraint="uq_employee_course")
+        .returning(EmployeeCourse.id)
+    )
+    matched = db.execute(select(func.count()).select_from(Employee).where(*filters)).scalar_one()
+    assigned = len(db.execute(stmt).all())
+    write_audit(
+        db,
+        actor_user_id,
+        "bulk_assign",
+        "course",
+        str(course.id),
+        {
+            "matched": matched,
+            "assigned": assigned,
+            "employee_ids": len(employee_ids or []),
+            "location": location,
+            "cost_center": cost_center,
+            "active": active,
+        },
+    )
+    db.commit()
+    return {"matched": matched, "assigned": assigned, "already_assigned": matched - assigned}
+
+
+# A due date typed in on the latest refresh update is kept; everything else follows the course interval.
+RECOMPUTE_CHUNK_SQL = text(
+    """
+    UPDATE employee_courses ec
+    SET next_refresh_due_date = calc.due, updated_at = now()
+    FROM (
+        SELECT e.id,
+               CASE
+                   WHEN NOT (c.requires_refresh AND c.refresh_interval_days > 0) THEN NULL
+                   WHEN latest.due_date_manual THEN latest.next_refresh_due_date
+                   ELSE COALESCE(latest.update_date, e.completed_date) + c.refresh_interval_days
+               END AS due
+        FROM employee_courses e
+        JOIN courses c ON c.id = e.course_id
+        LEFT JOIN LATERAL (
+            SELECT u.update_date, u.next_refresh_due_date, u.due_date_manual
+            FROM employee_course_updates u
+            WHERE u.employee_course_id = e.id
+            ORDER BY u.update_date DESC, u.id DESC
+            LIMIT 1
+        ) latest ON true
+        WHERE e.course_id = :course_id AND e.id > :after_id AND e.id <= :upper_id
+    ) calc
+    WHERE ec.id = calc.id AND ec.next_refresh_due_date IS DISTINCT FROM calc.due
+    """
+)
+MAX_ID = 2**31 - 1
+
+
+def recompute_refresh_due(db: Session, course_id: int, chunk_size: int = 5000) -> int:
+    db.flush()
+    updated = 0
+    after_id = 0
+    while True:
+        upper_id = db.execute(
+            select(EmployeeCourse.id)
+            .where(EmployeeCourse.course_id == course_id, EmployeeCourse.id > after_id)
+            .order_by(EmployeeCourse.id)
+            .offset(chunk_size - 1)
+            .limit(1)
+        ).scalar()
+        params = {"course_id": course_id, "after_id": after_id, "upper_id": upper_id or MAX_ID}
+        updated += db.execute(RECOMPUTE_CHUNK_SQL, params).rowcount
+        db.commit()
+        if upper_id is None:
+            return updated
+        after_id = upper_id
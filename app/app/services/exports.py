@@ -0,0 +1,279 @@
+from datetime import date, datetime, UTC
+from pathlib import Path
+from typing import Iterable, Iterator
+import csv
+import io
+import re
+import tempfile
+from sqlalchemy import select
+from app.db.session import SessionLocal
+from app.models import (
+    Attachment,
+    Certification,
+    Course,
+    CourseUpdateAttachment,
+    Employee,
+    EmployeeCourse,
+    EmployeeCourseUpdate,
+)
+from app.services.certifications import filter_certifications, status_for_expiry
+from app.services.xlsxstream import iter_xlsx
+from app.services.zipstream import ZipStream
+
+EXPORT_BATCH_SIZE = 1000
+CSV_FLUSH_BYTES = 64 * 1024
+MANIFEST_SPOOL_BYTES = 4 * 1024 * 1024
+
+MANIFEST_FIELDS = [
+    "archive_path",
+    "employee_id",
+    "employee",
+    "source",
+    "record",
+    "cert_type",
+    "original_filename",
+    "mime_type",
+    "file_size",
+    "checksum_sha256",
+    "uploaded_at",
+    "status",
+]
+
+
+CERTIFICATION_EXPORT_FIELDS = [
+    "id",
+    "employee_id",
+    "factorial_employee_id",
+    "last_name",
+    "first_name",
+    "location",
+    "cost_center",
+    "cert_type",
+    "title",
+    "provider",
+    "issued_date",
+    "expiry_date",
+    "status",
+]
+COURSE_EXPORT_FIELDS = [
+    "id",
+    "employee_id",
+    "factorial_employee_id",
+    "last_name",
+    "first_name",
+    "location",
+    "cost_center",
+    "course_id",
+    "course",
+    "completed_date",
+    "next_refresh_due_date",
+    "status",
+]
+
+
+def _safe(part: str) -> str:
+    return re.sub(r"[\\/\x00-\x1f]+", "_", part).strip() or "_"
+
+
+def _employee_folder(employee: Employee) -> str:
+    return _safe(f"{employee.last_name}_{employee.first_name}_{employee.id}")
+
+
+def _certification_rows(db, employee_id: int | None, cert_type: str, location: str):
+    stmt = (
+        select(Attachment, Certification, Employee)
+        .join(Certification, Attachment.certification_id == Certification.id)
+        .join(Employee, Certification.employee_id == Employee.id)
+    )
+    if employee_id:
+        stmt = stmt.where(Employee.id == employee_id)
+    if cert_type:
+        stmt = stmt.where(Certification.cert_type == cert_type)
+    if location:
+        stmt = stmt.where(Employee.location == location)
+    stmt = stmt.order_by(Employee.id, Certification.id, Attachment.id)
+    for att, cert, employee in db.execute(stmt.execution_options(yield_per=500)):
+        arcname = f"{_employee_folder(employee)}/certificazioni/{_safe(cert.cert_type)}/{att.id}_{_safe(att.original_filename)}"
+        yield att, employee, arcname, "certification", cert.title, cert.cert_type
+
+
+def _course_rows(db, employee_id: int | None, course_id: int | None, location: str):
+    stmt = (
+        select(CourseUpdateAttachment, Course, Employee)
+        .join(EmployeeCourseUpdate, CourseUpdateAttachment.course_update_id == EmployeeCourseUpdate.id)
+        .join(EmployeeCourse, EmployeeCourseUpdate.employee_course_id == EmployeeCourse.id)
+        .join(Course, EmployeeCourse.course_id == Course.id)
+        .join(Employee, EmployeeCourse.employee_id == Employee.id)
+    )
+    if employee_id:
+        stmt = stmt.where(Employee.id == employee_id)
+    if course_id:
+        stmt = stmt.where(Course.id == course_id)
+    if location:
+        stmt = stmt.where(Employee.location == location)
+    stmt = stmt.order_by(Employee.id, Course.id, CourseUpdateAttachment.id)
+    for att, course, employee in db.execute(stmt.execution_options(yield_per=500)):
+        arcname = f"{_employee_folder(employee)}/corsi/{_safe(course.title)}/{att.id}_{_safe(att.original_filename)}"
+        yield att, employee, arcname, "course", course.title, ""
+
+
+def iter_attachments_zip(
+    employee_id: int | None = None,
+    course_id: int | None = None,
+    cert_type: str = "",
+    location: str = "",
+) -> Iterator[bytes]:
+    archive = ZipStream()
+    # Rows are spooled to disk past MANIFEST_SPOOL_BYTES so the manifest does not grow with the archive.
+    with tempfile.SpooledTemporaryFile(
+        max_size=MANIFEST_SPOOL_BYTES, mode="w+", encoding="utf-8", newline=""
+    ) as manifest:
+        writer = csv.DictWriter(manifest, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+
+        db = SessionLocal()
+        db.info["read_only"] = True
+        try:
+            sources = []
+            if not course_id:
+                sources.append(_certification_rows(db, employee_id, cert_type, location))
+            if not cert_type:
+                sources.append(_course_rows(db, employee_id, course_id, location))
+
+            for rows in sources:
+                for att, employee, arcname, source, record, row_cert_type in rows:
+                    path = Path(att.stored_path)
+                    status = "ok" if path.exists() else "missing"
+                    if status == "ok":
+                        yield from archive.add_file(arcname, path, att.uploaded_at, att.file_size)
+                    writer.writerow(
+                        {
+                            "archive_path": arcname if status == "ok" else "",
+                            "employee_id": employee.id,
+                            "employee": f"{employee.first_name} {employee.last_name}",
+                            "source": source,
+                            "record": record,
+                            "cert_type": row_cert_type,
+                            "original_filename": att.original_filename,
+                            "mime_type": att.mime_type,
+                            "file_size": att.file_size,
+                            "checksum_sha256": att.checksum_sha256,
+                            "uploaded_at": att.uploaded_at.isoformat(),
+                            "status": status,
+                        }
+                    )
+        finally:
+            db.close()
+
+        manifest.seek(0)
+        chunks = (text.encode("utf-8") for text in iter(lambda: manifest.read(CSV_FLUSH_BYTES), ""))
+        yield from archive.add_stream("manifest.csv", chunks, datetime.now(UTC))
+    yield from archive.close()
+
+
+def iter_csv(header: list[str], rows: Iterable[Iterable]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _iter_table(fmt: str, sheet_name: str, header: list[str], rows: Iterable[Iterable]) -> Iterator:
+    if fmt == "xlsx":
+        return iter_xlsx(sheet_name, header, rows)
+    return (chunk.encode("utf-8") for chunk in iter_csv(header, rows))
+
+
+def _certification_export_rows(today: date, filters: dict) -> Iterator[tuple]:
+    db = SessionLocal()
+    db.info["read_only"] = True
+    try:
+        stmt = select(
+            Certification.id,
+            Certification.employee_id,
+            Employee.factorial_employee_id,
+            Employee.last_name,
+            Employee.first_name,
+            Employee.location,
+            Employee.cost_center,
+            Certification.cert_type,
+            Certification.title,
+            Certification.provider,
+            Certification.issued_date,
+            Certification.expiry_date,
+        ).join(Employee, Certification.employee_id == Employee.id)
+        stmt = filter_certifications(stmt, today, **filters).order_by(Certification.expiry_date, Certification.id)
+        for row in db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)):
+            yield (*row, status_for_expiry(row.expiry_date, today))
+    finally:
+        db.close()
+
+
+def iter_certifications_export(
+    fmt: str,
+    cert_type: str = "",
+    status: str = "",
+    location: str = "",
+    expires_within_days: int = 0,
+) -> Iterator:
+    filters = {
+        "cert_type": cert_type,
+        "status": status,
+        "location": location,
+        "expires_within_days": expires_within_days,
+    }
+    rows = _certification_export_rows(date.today(), filters)
+    return _iter_table(fmt, "Certificazioni", CERTIFICATION_EXPORT_FIELDS, rows)
+
+
+def course_status(completed_date: date | None, due_date: date | None, today: date, due_soon_days: int = 30) -> str:
+    if due_date is None:
+        return "ok" if completed_date else "missing"
+    if due_date < today:
+        return "overdue"
+    if (due_date - today).days <= due_soon_days:
+        return "due-soon"
+    return "ok"
+
+
+def _course_export_rows(today: date, course_id: int | None, location: str, cost_center: str) -> Iterator[tuple]:
+    db = SessionLocal()
+    db.info["read_only"] = True
+    try:
+        stmt = select(
+            EmployeeCourse.id,
+            EmployeeCourse.employee_id,
+            Employee.factorial_employee_id,
+            Employee.last_name,
+            Employee.first_name,
+            Employee.location,
+            Employee.cost_center,
+            Course.id,
+            Course.title,
+            EmployeeCourse.completed_date,
+            EmployeeCourse.next_refresh_due_date,
+        ).join(Employee, EmployeeCourse.employee_id == Employee.id).join(Course, EmployeeCourse.course_id == Course.id)
+        if course_id:
+            stmt = stmt.where(Course.id == course_id)
+        if location:
+            stmt = stmt.where(Employee.location == location)
+        if cost_center:
+            stmt = stmt.where(Employee.cost_center == cost_center)
+        stmt = stmt.order_by(Employee.last_name, Employee.first_name, Employee.id, Course.title)
+        for row in db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)):
+            yield (*row, course_status(row.completed_date, row.next_refresh_due_date, today))
+    finally:
+        db.close()
+
+
+def iter_course_status_export(
+    fmt: str, course_id: int | None = None, location: str = "", cost_center: str = ""
+) -> Iterator:
+    rows = _course_export_rows(date.today(), course_id, location, cost_center)
+    return _iter_table(fmt, "Corsi", COURSE_EXPORT_FIELDS, rows)
@@ -2,18 +2,17 @@ from datetime import datetime, UTC
 import logging
 import httpx
 from sqlalchemy.orm import Session
-from app.core.config import get_settings
 from app.models import Employee
-from app.services.settings_store import get_setting
+from app.services.settings_store import get_settings_snapshot
 
 logger = logging.getLogger(__name__)
 
 
-def _resolve_config(db: Session) -> tuple[str, str, str]:
-    settings = get_settings()
-    base_url = get_setting(db, "factorial_base_url", settings.factorial_base_url).strip()
-    token = get_setting(db, "factorial_api_token", settings.factorial_api_token).strip()
-    company_id = get_setting(db, "factorial_company_id", settings.factorial_company_id).strip()
+def _resolve_config() -> tuple[str, str, str]:
+    snapshot = get_settings_snapshot()
+    base_url = snapshot.get("factorial_base_url").strip()
+    token = snapshot.get("factorial_api_token").strip()
+    company_id = snapshot.get("factorial_company_id").strip()
     return base_url, token, company_id
 
 
@@ -35,7 +34,7 @@ def _extract_employee(raw: dict) -> dict:
 
 
 def sync_factorial_employees(db: Session) -> dict:
-    base_url, token, company_id = _resolve_config(db)
+    base_url, token, company_id = _resolve_config()
     if not base_url or not token:
         return {"ok": False, "message": "Factorial config missing", "created": 0, "updated": 0}
 
@@ -1,29 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
 from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
 import hashlib
-import uuid
-from fastapi import UploadFile, HTTPException
+import os
+import tempfile
+from urllib.parse import quote
+from fastapi import Request, UploadFile, HTTPException
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
 from app.core.config import get_settings
+from app.core.metrics import UPLOAD_BYTES, UPLOAD_DURATION, UPLOADS
+from app.models import Blob
+from app.services.http_cache import etag_matches
 
 ALLOWED_MIME = {"application/pdf", "image/jpeg", "image/png"}
 ALLOWED_EXT = {".pdf", ".jpg", ".jpeg", ".png"}
+CHUNK_SIZE = 1024 * 1024
+# mkstemp creates 0600 files; stored blobs keep the umask-based mode a plain open() would give, so
+# nginx (X-Accel-Redirect) and backup readers running as another user can still read them.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
 
+SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
 
-def store_upload(file: UploadFile) -> tuple[str, int, str]:
+
+class StoredUpload(NamedTuple):
+    path: str
+    size: int
+    checksum: str
+    mime_type: str
+    created: bool = False
+
+
+def sniff_mime(head: bytes) -> str | None:
+    for signature, mime in SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    return None
+
+
+def store_upload(file: UploadFile) -> StoredUpload:
+    started = perf_counter()
     settings = get_settings()
-    content = file.file.read()
-    size = len(content)
-    if size > settings.max_upload_mb * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large")
+    max_bytes = settings.max_upload_mb * 1024 * 1024
 
     ext = Path(file.filename or "").suffix.lower()
     if file.content_type not in ALLOWED_MIME or ext not in ALLOWED_EXT:
+        UPLOADS.labels("rejected").inc()
         raise HTTPException(status_code=400, detail="Unsupported file type")
 
     folder = Path(settings.upload_dir)
     folder.mkdir(parents=True, exist_ok=True)
-    filename = f"{uuid.uuid4().hex}{ext}"
-    path = folder / filename
-    path.write_bytes(content)
+    fd, tmp_name = tempfile.mkstemp(dir=folder, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+    mime_type = None
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, "wb") as out:
+            while chunk := file.file.read(CHUNK_SIZE):
+                if mime_type is None:
+                    mime_type = sniff_mime(chunk)
+                    if mime_type is None:
+                        raise HTTPException(status_code=400, detail="Unsupported file type")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail="File too large")
+                digest.update(chunk)
+                out.write(chunk)
+        if mime_type is None:
+            raise HTTPException(status_code=400, detail="Empty file")
+
+        checksum = digest.hexdigest()
+        path = blob_path(checksum)
+        created = not path.exists()
+        if not created:
+            # Same content is already stored: keep the existing blob and mark it as
+            # recently used so storage cleanup leaves it alone.
+            Path(tmp_name).unlink()
+            os.utime(path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, path)
+    except BaseException as exc:
+        Path(tmp_name).unlink(missing_ok=True)
+        UPLOADS.labels("rejected" if isinstance(exc, HTTPException) else "error").inc()
+        raise
+
+    UPLOADS.labels("stored" if created else "deduplicated").inc()
+    UPLOAD_BYTES.inc(size)
+    UPLOAD_DURATION.observe(perf_counter() - started)
+    return StoredUpload(str(path), size, checksum, mime_type, created)
+
+
+_upload_pool = ThreadPoolExecutor(max_workers=get_settings().upload_workers, thread_name_prefix="upload")
+
+
+def store_uploads(files: list[UploadFile]) -> list[StoredUpload]:
+    if len(files) <= 1:
+        return [store_upload(f) for f in files]
+    futures = [_upload_pool.submit(store_upload, f) for f in files]
+    stored = []
+    error = None
+    for future in futures:
+        try:
+            stored.append(future.result())
+        except Exception as exc:
+            error = error or exc
+    if error:
+        # Stored blobs may already be shared with a concurrent upload of the same content, so they
+        # are left for the storage reconcile job to remove once unreferenced.
+        raise error
+    return stored
+
 
-    checksum = hashlib.sha256(content).hexdigest()
-    return str(path), size, checksum
+def blob_path(checksum: str) -> Path:
+    return Path(get_settings().upload_dir) / checksum[:2] / checksum[2:4] / checksum
+
+
+def acquire_blob(db: Session, stored: StoredUpload) -> None:
+    stmt = pg_insert(Blob).values(
+        sha256=stored.checksum,
+        stored_path=stored.path,
+        mime_type=stored.mime_type,
+        file_size=stored.size,
+        ref_count=1,
+        created_at=datetime.now(UTC),
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Blob.sha256],
+            set_={"ref_count": Blob.ref_count + 1},
+        )
+    )
+
+
+def release_blob(db: Session, checksum: str) -> None:
+    db.execute(update(Blob).where(Blob.sha256 == checksum).values(ref_count=Blob.ref_count - 1))
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"inline; filename*=utf-8''{quoted}"
+    return f'inline; filename="{filename}"'
+
+
+def attachment_response(
+    request: Request, stored_path: str, checksum: str, filename: str, media_type: str
+) -> Response:
+    etag = f'"{checksum}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    path = Path(stored_path)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="File missing")
+
+    settings = get_settings()
+    if settings.download_accel_prefix:
+        relative = os.path.relpath(os.path.realpath(path), os.path.realpath(settings.upload_dir))
+        # Legacy rows or a changed UPLOAD_DIR can leave files outside the accel location; serve those directly.
+        if not relative.startswith(".."):
+            headers["X-Accel-Redirect"] = f"{settings.download_accel_prefix.rstrip('/')}/{Path(relative).as_posix()}"
+            headers["Content-Disposition"] = _content_disposition(filename)
+            return Response(media_type=media_type, headers=headers)
+    return FileResponse(
+        path=path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        content_disposition_type="inline",
+    )
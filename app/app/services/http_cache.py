@@ -0,0 +1,73 @@
+from datetime import date, datetime, time, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import json
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import TableVersion
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+class ListValidators:
+    def __init__(self, etag: str, last_modified: datetime) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache",
+        }
+
+    def not_modified(self, request: Request) -> Response | None:
+        if "if-none-match" in request.headers:
+            matched = etag_matches(request, self.etag)
+        else:
+            matched = _not_modified_since(request, self.last_modified)
+        if matched:
+            return Response(status_code=304, headers=self.headers)
+        return None
+
+
+def _not_modified_since(request: Request, last_modified: datetime) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    return last_modified.replace(microsecond=0) <= since
+
+
+async def list_validators(
+    db: AsyncSession, request: Request, tables: tuple[str, ...], as_of: date
+) -> ListValidators:
+    rows = (
+        await db.execute(
+            select(TableVersion.table_name, TableVersion.version, TableVersion.updated_at).where(
+                TableVersion.table_name.in_(tables)
+            )
+        )
+    ).all()
+    versions = sorted((name, version) for name, version, _ in rows)
+    params = sorted(request.query_params.multi_items())
+    raw = json.dumps([request.url.path, versions, params, as_of.isoformat()])
+    etag = f'"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+    # Status columns depend on the current day, so midnight counts as a modification too.
+    last_modified = datetime.combine(as_of, time.min, tzinfo=UTC)
+    for _, _, updated_at in rows:
+        last_modified = max(last_modified, updated_at)
+    return ListValidators(etag, last_modified)
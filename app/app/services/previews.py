@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from app.core.config import get_settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MIME = {"image/jpeg", "image/png"}
+
+_settings = get_settings()
+_executor = ThreadPoolExecutor(max_workers=_settings.preview_workers, thread_name_prefix="preview")
+_pending: set[str] = set()
+_pending_lock = threading.Lock()
+
+
+def preview_path(checksum: str) -> Path:
+    return Path(_settings.preview_dir) / checksum[:2] / f"{checksum}.jpg"
+
+
+def can_preview(mime_type: str) -> bool:
+    if mime_type in IMAGE_MIME:
+        return Image is not None
+    if mime_type == "application/pdf":
+        return shutil.which("pdftoppm") is not None
+    return False
+
+
+def _render_image(source: str, target: str, size: int) -> None:
+    with Image.open(source) as img:
+        img.draft("RGB", (size, size))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((size, size))
+        img.save(target, "JPEG", quality=80, optimize=True)
+
+
+def _render_pdf(source: str, target: str, size: int) -> None:
+    base = target.removesuffix(".jpg")
+    subprocess.run(
+        ["pdftoppm", "-jpeg", "-f", "1", "-l", "1", "-singlefile", "-scale-to", str(size), source, base],
+        check=True,
+        capture_output=True,
+        timeout=60,
+    )
+
+
+def _generate(checksum: str, source: str, mime_type: str) -> None:
+    target = preview_path(checksum)
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".preview-", suffix=".jpg")
+        os.close(fd)
+        try:
+            if mime_type == "application/pdf":
+                _render_pdf(source, tmp, _settings.preview_size)
+            else:
+                _render_image(source, tmp, _settings.preview_size)
+            os.replace(tmp, target)
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+    except Exception:
+        logger.warning("Preview generation failed", extra={"checksum": checksum}, exc_info=True)
+    finally:
+        with _pending_lock:
+            _pending.discard(checksum)
+
+
+def schedule_preview(checksum: str, source: str, mime_type: str) -> None:
+    if not can_preview(mime_type) or preview_path(checksum).exists():
+        return
+    with _pending_lock:
+        if checksum in _pending:
+            return
+        _pending.add(checksum)
+    _executor.submit(_generate, checksum, source, mime_type)
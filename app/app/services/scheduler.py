@@ -1,20 +1,34 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, UTC
 import logging
-from app.db.session import SessionLocal
+import os
+import threading
+from app.db.session import SessionLocal, engine, read_engine, replica_lag
 from app.core.config import get_settings
+from app.core.metrics import track_job
 from app.services.factorial import sync_factorial_employees
 from app.services.alerts import run_alerts
+from app.services.audit_retention import run_audit_maintenance
+from app.services.storage_gc import reconcile_uploads
+from app.services.reports import take_compliance_snapshot
 
 logger = logging.getLogger(__name__)
 
-scheduler = BackgroundScheduler(timezone="UTC")
+# Session-level advisory lock: only the worker holding it runs the cron jobs.
+LEADER_LOCK_SQL = "SELECT pg_try_advisory_lock(hashtext('traccia_scheduler'))"
+
+local_scheduler = BackgroundScheduler(timezone="UTC")
 
 
 def _job_sync_factorial() -> None:
     db = SessionLocal()
     try:
-        result = sync_factorial_employees(db)
+        with track_job("factorial_sync") as run:
+            result = sync_factorial_employees(db)
+            if not result.get("ok", True):
+                run["outcome"] = "failed"
         logger.info("factorial_sync", extra={"result": result})
     finally:
         db.close()
@@ -23,17 +37,57 @@ def _job_sync_factorial() -> None:
 def _job_alerts() -> None:
     db = SessionLocal()
     try:
-        result = run_alerts(db)
+        with track_job("cert_alerts"):
+            result = run_alerts(db)
         logger.info("alert_job", extra={"result": result})
     finally:
         db.close()
 
 
-def start_scheduler() -> None:
+def _job_audit_maintenance() -> None:
+    db = SessionLocal()
+    try:
+        with track_job("audit_maintenance"):
+            result = run_audit_maintenance(db)
+        logger.info("audit_maintenance", extra={"result": result})
+    finally:
+        db.close()
+
+
+def _job_storage_reconcile() -> None:
     settings = get_settings()
-    if scheduler.running:
-        return
+    db = SessionLocal()
+    try:
+        with track_job("storage_reconcile"):
+            result = reconcile_uploads(
+                db,
+                delete_orphans=settings.storage_gc_delete,
+                grace_hours=settings.storage_gc_grace_hours,
+                verify_checksums=settings.storage_gc_verify,
+                workers=settings.storage_gc_workers,
+            )
+        logger.info("storage_reconcile", extra={"result": result})
+    finally:
+        db.close()
+
 
+def _job_compliance_snapshot() -> None:
+    db = SessionLocal()
+    try:
+        with track_job("compliance_snapshot"):
+            result = take_compliance_snapshot(db)
+        logger.info("compliance_snapshot", extra={"result": result})
+    finally:
+        db.close()
+
+
+def _job_replica_lag() -> None:
+    replica_lag.refresh(read_engine)
+
+
+def _build_scheduler() -> BackgroundScheduler:
+    settings = get_settings()
+    scheduler = BackgroundScheduler(timezone="UTC")
     minute, hour, day, month, dow = settings.factorial_sync_cron.split(" ")
     scheduler.add_job(
         _job_sync_factorial,
@@ -47,9 +101,97 @@ def start_scheduler() -> None:
         id="cert_alerts",
         replace_existing=True,
     )
-    scheduler.start()
+    scheduler.add_job(
+        _job_audit_maintenance,
+        trigger=CronTrigger(hour=1, minute=30),
+        id="audit_maintenance",
+        replace_existing=True,
+        next_run_time=datetime.now(UTC),
+    )
+    scheduler.add_job(
+        _job_storage_reconcile,
+        trigger=CronTrigger(hour=4, minute=0),
+        id="storage_reconcile",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        _job_compliance_snapshot,
+        trigger=CronTrigger(hour=23, minute=50),
+        id="compliance_snapshot",
+        replace_existing=True,
+    )
+    return scheduler
+
+
+class SchedulerLeader:
+    def __init__(self, check_seconds: float = 30.0) -> None:
+        self.check_seconds = check_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduler-leader", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._lead()
+            except Exception:
+                logger.exception("Scheduler leader connection lost")
+            self._stop.wait(self.check_seconds)
+
+    def _lead(self) -> None:
+        conn = engine.raw_connection()
+        conn.detach()
+        raw = conn.driver_connection
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(LEADER_LOCK_SQL)
+                if not cursor.fetchone()[0]:
+                    return
+            logger.info("scheduler_leader_acquired", extra={"pid": os.getpid()})
+            scheduler = _build_scheduler()
+            scheduler.start()
+            try:
+                # The lock lives as long as this connection; once it drops another worker may take over.
+                while not self._stop.wait(self.check_seconds):
+                    with raw.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+            finally:
+                scheduler.shutdown(wait=False)
+        finally:
+            conn.close()
+
+
+scheduler_leader = SchedulerLeader()
+
+
+def start_scheduler() -> None:
+    settings = get_settings()
+    if read_engine is not None and not local_scheduler.running:
+        # Each worker routes its own reads, so the lag check runs in every process.
+        local_scheduler.add_job(
+            _job_replica_lag,
+            trigger=IntervalTrigger(seconds=settings.replica_lag_check_seconds),
+            id="replica_lag",
+            replace_existing=True,
+            next_run_time=datetime.now(UTC),
+        )
+        local_scheduler.start()
+    scheduler_leader.start()
 
 
 def shutdown_scheduler() -> None:
-    if scheduler.running:
-        scheduler.shutdown(wait=False)
+    scheduler_leader.stop()
+    if local_scheduler.running:
+        local_scheduler.shutdown(wait=False)
@@ -1,10 +1,186 @@
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+import logging
+import select
+import threading
+import time
+from sqlalchemy import event, text
 from sqlalchemy.orm import Session
-from app.models import Setting
+from app.core.config import get_settings
+from app.db.session import SessionLocal, engine
+from app.models import AlertSetting, Setting
 
+logger = logging.getLogger(__name__)
 
-def get_setting(db: Session, key: str, default: str = "") -> str:
-    row = db.get(Setting, key)
-    return row.value if row else default
+CHANNEL = "settings_changed"
+VERSION_KEY = "settings_version"
+FACTORIAL_KEYS = ("factorial_base_url", "factorial_api_token", "factorial_company_id")
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    cert_type: str | None = None
+    thresholds_csv: str = "90,60,30,14,7,1"
+    email_enabled: bool = True
+    webhook_enabled: bool = False
+    recipient_emails: str = ""
+
+
+DEFAULT_ALERT_RULE = AlertRule()
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    version: int
+    values: Mapping[str, str]
+    alert_rules: Mapping[str | None, AlertRule]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def get(self, key: str, default: str | None = None) -> str:
+        if key in self.values:
+            return self.values[key]
+        if default is not None:
+            return default
+        return getattr(get_settings(), key, "")
+
+    def rule_for(self, cert_type: str | None) -> AlertRule:
+        return self.alert_rules.get(cert_type) or self.alert_rules.get(None) or DEFAULT_ALERT_RULE
+
+
+class SettingsRegistry:
+    def __init__(self, max_age_seconds: float) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._snapshot: SettingsSnapshot | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> SettingsSnapshot:
+        current = self._snapshot
+        if current is not None and time.monotonic() - current.loaded_at < self.max_age_seconds:
+            return current
+        with self._lock:
+            current = self._snapshot
+            if current is None or time.monotonic() - current.loaded_at >= self.max_age_seconds:
+                generation = self._generation
+                current = self._load()
+                if generation == self._generation:
+                    self._snapshot = current
+        return current
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+
+    def _load(self) -> SettingsSnapshot:
+        db = SessionLocal()
+        try:
+            values = dict(db.query(Setting.key, Setting.value).all())
+            rules: dict[str | None, AlertRule] = {}
+            for row in db.query(AlertSetting).order_by(AlertSetting.id):
+                rules.setdefault(
+                    row.cert_type,
+                    AlertRule(
+                        cert_type=row.cert_type,
+                        thresholds_csv=row.thresholds_csv,
+                        email_enabled=row.email_enabled,
+                        webhook_enabled=row.webhook_enabled,
+                        recipient_emails=row.recipient_emails,
+                    ),
+                )
+        finally:
+            db.close()
+        version = int(values.pop(VERSION_KEY, "0") or 0)
+        return SettingsSnapshot(version, MappingProxyType(values), MappingProxyType(rules))
+
+
+class SettingsListener:
+    def __init__(self, registry: SettingsRegistry, reconnect_seconds: float = 5.0) -> None:
+        self.registry = registry
+        self.reconnect_seconds = reconnect_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="settings-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Settings listener disconnected")
+            self.registry.invalidate()
+            self._stop.wait(self.reconnect_seconds)
+
+    def _listen(self) -> None:
+        conn = engine.raw_connection()
+        conn.detach()
+        raw = conn.driver_connection
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            # Anything published while we were not listening is unknown, so start from a fresh load.
+            self.registry.invalidate()
+            while not self._stop.is_set():
+                if not select.select([raw], [], [], 1.0)[0]:
+                    continue
+                raw.poll()
+                if raw.notifies:
+                    raw.notifies.clear()
+                    self.registry.invalidate()
+        finally:
+            conn.close()
+
+
+settings_registry = SettingsRegistry(get_settings().settings_cache_seconds)
+settings_listener = SettingsListener(settings_registry)
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_settings_change(session: Session) -> None:
+    if not session.info.pop("settings_changed", False):
+        return
+    version = session.execute(
+        text(
+            "INSERT INTO settings (key, value) VALUES (:key, '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = (settings.value::bigint + 1)::text "
+            "RETURNING value"
+        ),
+        {"key": VERSION_KEY},
+    ).scalar()
+    session.execute(text("SELECT pg_notify(:channel, :version)"), {"channel": CHANNEL, "version": version})
+    session.info["settings_published"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_settings(session: Session) -> None:
+    if session.info.pop("settings_published", False):
+        settings_registry.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_settings_change(session: Session) -> None:
+    session.info.pop("settings_changed", None)
+    session.info.pop("settings_published", None)
+
+
+def get_settings_snapshot() -> SettingsSnapshot:
+    return settings_registry.snapshot()
+
+
+def get_setting(key: str, default: str | None = None) -> str:
+    return settings_registry.snapshot().get(key, default)
 
 
 def set_setting(db: Session, key: str, value: str) -> None:
@@ -14,4 +190,35 @@ def set_setting(db: Session, key: str, value: str) -> None:
         db.add(row)
     else:
         row.value = value
-    db.commit()
+    db.info["settings_changed"] = True
+
+
+def set_alert_rule(
+    db: Session,
+    cert_type: str | None,
+    thresholds_csv: str,
+    recipient_emails: str,
+    email_enabled: bool,
+    webhook_enabled: bool,
+) -> None:
+    query = db.query(AlertSetting)
+    if cert_type is None:
+        rule = query.filter(AlertSetting.cert_type.is_(None)).first()
+    else:
+        rule = query.filter_by(cert_type=cert_type).first()
+    if not rule:
+        rule = AlertSetting(cert_type=cert_type)
+        db.add(rule)
+    rule.thresholds_csv = thresholds_csv
+    rule.recipient_emails = recipient_emails
+    rule.email_enabled = email_enabled
+    rule.webhook_enabled = webhook_enabled
+    db.info["settings_changed"] = True
+
+
+def start_settings_listener() -> None:
+    settings_listener.start()
+
+
+def stop_settings_listener() -> None:
+    settings_listener.stop()
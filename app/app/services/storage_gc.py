@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from typing import Iterator
+import argparse
+import hashlib
+import logging
+import os
+import time
+from sqlalchemy import delete, exists, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.db.session import SessionLocal
+from app.models import Attachment, Blob, CourseUpdateAttachment
+
+logger = logging.getLogger(__name__)
+
+REPORT_SAMPLE = 100
+
+
+def _walk_files(root: str) -> Iterator[os.DirEntry]:
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def _storage_key(path: str, root: str) -> str:
+    return os.path.relpath(os.path.realpath(path), root)
+
+
+def _load_referenced_paths(db: Session, root: str, batch_size: int, report: dict) -> set[str]:
+    known: set[str] = set()
+    for model, table in ((Attachment, "attachments"), (CourseUpdateAttachment, "course_update_attachments")):
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(model.id, model.stored_path).where(model.id > last_id).order_by(model.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            for row_id, stored_path in rows:
+                key = _storage_key(stored_path, root)
+                if key in known:
+                    continue
+                known.add(key)
+                if not os.path.exists(stored_path):
+                    report["missing"] += 1
+                    if len(report["missing_rows"]) < REPORT_SAMPLE:
+                        report["missing_rows"].append({"table": table, "id": row_id, "stored_path": stored_path})
+    return known
+
+
+def _purge_unreferenced_blobs(db: Session, cutoff: datetime) -> int:
+    referenced = or_(
+        exists().where(Attachment.checksum_sha256 == Blob.sha256),
+        exists().where(CourseUpdateAttachment.checksum_sha256 == Blob.sha256),
+    )
+    result = db.execute(
+        delete(Blob).where(Blob.ref_count <= 0, Blob.created_at < cutoff, ~referenced)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def _checksum_status(path: str, expected: str) -> str:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as fh:
+            while chunk := fh.read(1024 * 1024):
+                digest.update(chunk)
+    except OSError:
+        return "unreadable"
+    return "ok" if digest.hexdigest() == expected else "mismatch"
+
+
+def _verify_checksums(db: Session, batch_size: int, workers: int, report: dict) -> None:
+    last_sha = ""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            rows = db.execute(
+                select(Blob.sha256, Blob.stored_path).where(Blob.sha256 > last_sha).order_by(Blob.sha256).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_sha = rows[-1].sha256
+            results = pool.map(lambda row: _checksum_status(row.stored_path, row.sha256), rows)
+            for row, status in zip(rows, results):
+                blob = {"sha256": row.sha256, "stored_path": row.stored_path}
+                if status == "unreadable":
+                    report["unreadable_blobs"] += 1
+                    if len(report["unreadable_blob_paths"]) < REPORT_SAMPLE:
+                        report["unreadable_blob_paths"].append(blob)
+                    continue
+                report["verified"] += 1
+                if status == "mismatch":
+                    report["checksum_mismatches"] += 1
+                    if len(report["mismatched_blobs"]) < REPORT_SAMPLE:
+                        report["mismatched_blobs"].append(blob)
+
+
+def reconcile_uploads(
+    db: Session,
+    delete_orphans: bool = False,
+    grace_hours: int = 24,
+    verify_checksums: bool = False,
+    workers: int = 4,
+    batch_size: int = 5000,
+) -> dict:
+    settings = get_settings()
+    cutoff = datetime.now(UTC) - timedelta(hours=grace_hours)
+    report = {
+        "scanned": 0,
+        "orphans": 0,
+        "orphan_bytes": 0,
+        "deleted": 0,
+        "orphan_files": [],
+        "missing": 0,
+        "missing_rows": [],
+        "purged_blobs": 0,
+        "verified": 0,
+        "checksum_mismatches": 0,
+        "mismatched_blobs": [],
+        "unreadable_blobs": 0,
+        "unreadable_blob_paths": [],
+        "delete_refused": False,
+    }
+
+    if delete_orphans:
+        report["purged_blobs"] = _purge_unreferenced_blobs(db, cutoff)
+    root = os.path.realpath(settings.upload_dir)
+    known = _load_referenced_paths(db, root, batch_size, report)
+
+    if os.path.isdir(root):
+        cutoff_ts = time.time() - grace_hours * 3600
+        referenced_found = 0
+        orphans: list[str] = []
+        for entry in _walk_files(root):
+            report["scanned"] += 1
+            if _storage_key(entry.path, root) in known:
+                referenced_found += 1
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff_ts:
+                continue
+            report["orphans"] += 1
+            report["orphan_bytes"] += stat.st_size
+            if len(report["orphan_files"]) < REPORT_SAMPLE:
+                report["orphan_files"].append(entry.path)
+            if delete_orphans:
+                orphans.append(entry.path)
+
+        # No referenced file found on disk means the paths do not line up (wrong UPLOAD_DIR, unmounted
+        # volume), not that everything is orphaned.
+        if orphans and known and not referenced_found:
+            report["delete_refused"] = True
+            logger.error(
+                "storage_reconcile_delete_refused",
+                extra={"upload_dir": root, "referenced": len(known), "orphans": report["orphans"]},
+            )
+        else:
+            for path in orphans:
+                Path(path).unlink(missing_ok=True)
+                report["deleted"] += 1
+
+    if verify_checksums:
+        _verify_checksums(db, batch_size, workers, report)
+    return report
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Reconcile the upload directory with attachment rows.")
+    parser.add_argument("--delete", action="store_true", help="delete orphan files instead of only reporting them")
+    parser.add_argument("--verify", action="store_true", help="re-hash stored blobs and report checksum mismatches")
+    parser.add_argument("--grace-hours", type=int, default=settings.storage_gc_grace_hours)
+    parser.add_argument("--workers", type=int, default=settings.storage_gc_workers)
+    args = parser.parse_args()
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        report = reconcile_uploads(
+            db,
+            delete_orphans=args.delete,
+            grace_hours=args.grace_hours,
+            verify_checksums=args.verify,
+            workers=args.workers,
+        )
+        logger.info("storage_reconcile", extra={"result": report})
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
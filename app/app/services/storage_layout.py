@@ -0,0 +1,73 @@
+from pathlib import Path
+import argparse
+import logging
+import os
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from app.core.logging import configure_logging
+from app.db.session import SessionLocal
+from app.models import Blob
+from app.services.files import blob_path
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_blob_layout(db: Session, batch_size: int = 1000) -> dict:
+    moved = 0
+    missing = 0
+    last_sha = ""
+    while True:
+        blobs = db.scalars(
+            select(Blob).where(Blob.sha256 > last_sha).order_by(Blob.sha256.asc()).limit(batch_size)
+        ).all()
+        if not blobs:
+            break
+        last_sha = blobs[-1].sha256
+
+        changed = []
+        for blob in blobs:
+            target = blob_path(blob.sha256)
+            if blob.stored_path == str(target):
+                continue
+            source = Path(blob.stored_path)
+            if source.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, target)
+                moved += 1
+            elif not target.exists():
+                missing += 1
+                continue
+            blob.stored_path = str(target)
+            changed.append(blob.sha256)
+
+        if changed:
+            db.flush()
+            for table in ("attachments", "course_update_attachments"):
+                db.execute(
+                    text(
+                        f"UPDATE {table} SET stored_path = b.stored_path FROM blobs b "
+                        f"WHERE {table}.checksum_sha256 = b.sha256 AND b.sha256 = ANY(:shas)"
+                    ),
+                    {"shas": changed},
+                )
+        db.commit()
+        logger.info("blob_layout_batch", extra={"last_sha": last_sha, "moved": moved, "missing": missing})
+    return {"moved": moved, "missing": missing}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move stored uploads into the sharded ab/cd/<sha256> layout.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        result = migrate_blob_layout(db, batch_size=args.batch_size)
+        logger.info("blob_layout_done", extra={"result": result})
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
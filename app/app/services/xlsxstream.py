@@ -0,0 +1,80 @@
+from datetime import date, datetime, UTC
+from typing import Iterable, Iterator
+from xml.sax.saxutils import escape
+import re
+from app.services.zipstream import ZipStream
+
+ROW_BATCH = 500
+_ILLEGAL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="1"><font/></fonts><fills count="1"><fill/></fills><borders count="1"><border/></borders>
+<cellStyleXfs count="1"><xf/></cellStyleXfs><cellXfs count="1"><xf/></cellXfs>
+</styleSheet>"""
+
+SHEET_HEAD = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>"""
+SHEET_TAIL = "</sheetData></worksheet>"
+
+
+def _cell(value) -> str:
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    text = escape(_ILLEGAL_XML.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _sheet_chunks(header: list[str], rows: Iterable[Iterable]) -> Iterator[bytes]:
+    yield SHEET_HEAD.encode()
+    parts = ["<row>" + "".join(_cell(v) for v in header) + "</row>"]
+    for row in rows:
+        parts.append("<row>" + "".join(_cell(v) for v in row) + "</row>")
+        if len(parts) >= ROW_BATCH:
+            yield "".join(parts).encode()
+            parts = []
+    parts.append(SHEET_TAIL)
+    yield "".join(parts).encode()
+
+
+def iter_xlsx(sheet_name: str, header: list[str], rows: Iterable[Iterable]) -> Iterator[bytes]:
+    now = datetime.now(UTC)
+    archive = ZipStream()
+    yield from archive.add_bytes("[Content_Types].xml", CONTENT_TYPES.encode(), now)
+    yield from archive.add_bytes("_rels/.rels", ROOT_RELS.encode(), now)
+    yield from archive.add_bytes("xl/workbook.xml", WORKBOOK.format(name=escape(sheet_name[:31])).encode(), now)
+    yield from archive.add_bytes("xl/_rels/workbook.xml.rels", WORKBOOK_RELS.encode(), now)
+    yield from archive.add_bytes("xl/styles.xml", STYLES.encode(), now)
+    yield from archive.add_stream("xl/worksheets/sheet1.xml", _sheet_chunks(header, rows), now)
+    yield from archive.close()
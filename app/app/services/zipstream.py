@@ -0,0 +1,74 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+import io
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+
+    def __init__(self) -> None:
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", allowZip64=True)
+
+    def _drain(self) -> Iterator[bytes]:
+        data = self._sink.drain()
+        if data:
+            yield data
+
+    def add_file(
+        self, arcname: str, path: Path, modified: datetime, size: int, compress: bool = False
+    ) -> Iterator[bytes]:
+        info = zipfile.ZipInfo(arcname, date_time=modified.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.file_size = size
+        with open(path, "rb") as src, self._zip.open(info, mode="w") as dst:
+            while chunk := src.read(CHUNK_SIZE):
+                dst.write(chunk)
+                yield from self._drain()
+        yield from self._drain()
+
+    def add_stream(
+        self, arcname: str, chunks: Iterable[bytes], modified: datetime, compress: bool = True
+    ) -> Iterator[bytes]:
+        info = zipfile.ZipInfo(arcname, date_time=modified.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        with self._zip.open(info, mode="w", force_zip64=True) as dst:
+            for chunk in chunks:
+                dst.write(chunk)
+                yield from self._drain()
+        yield from self._drain()
+
+    def add_bytes(self, arcname: str, data: bytes, modified: datetime) -> Iterator[bytes]:
+        info = zipfile.ZipInfo(arcname, date_time=modified.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self._zip.writestr(info, data)
+        yield from self._drain()
+
+    def close(self) -> Iterator[bytes]:
+        self._zip.close()
+        yield from self._drain()
@@ -1,5 +1,10 @@
 #!/bin/sh
 set -e
 
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 alembic upgrade head
-exec uvicorn app.main:app --host ${HOST:-0.0.0.0} --port ${PORT:-8080}
+exec uvicorn app.main:app --host ${HOST:-0.0.0.0} --port ${PORT:-8080} --workers ${WEB_CONCURRENCY:-1}
@@ -0,0 +1,27 @@
+from app.core.timing import normalize_sql
+
+
+def test_string_and_number_literals_are_replaced():
+    statement = "SELECT * FROM employees WHERE id = 42 AND name = 'O''Brien' AND score > 3.5"
+    assert normalize_sql(statement) == "SELECT * FROM employees WHERE id = ? AND name = ? AND score > ?"
+
+
+def test_identifiers_and_positional_placeholders_are_kept():
+    statement = "SELECT a1 FROM t2 WHERE x = $4 AND y = %(y_1)s"
+    assert normalize_sql(statement) == statement
+
+
+def test_in_lists_collapse_regardless_of_length():
+    assert normalize_sql("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == "SELECT ? FROM t WHERE id IN (...)"
+    assert normalize_sql("SELECT * FROM t WHERE id IN ('a', 'b')") == "SELECT * FROM t WHERE id IN (...)"
+    assert normalize_sql("SELECT * FROM t WHERE id IN ($1, $2, $3)") == "SELECT * FROM t WHERE id IN (...)"
+    assert (
+        normalize_sql("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)")
+        == "SELECT * FROM t WHERE id IN (...)"
+    )
+    assert normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s)") == "INSERT INTO t (a, b) VALUES (...)"
+
+
+def test_whitespace_is_collapsed_and_length_capped():
+    assert normalize_sql("SELECT  a,\n\t b\nFROM t") == "SELECT a, b FROM t"
+    assert len(normalize_sql("SELECT " + "x, " * 2000 + "y FROM t")) == 2000
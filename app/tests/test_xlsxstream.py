@@ -0,0 +1,51 @@
+from datetime import date
+import io
+import zipfile
+from xml.etree import ElementTree
+from app.services.xlsxstream import ROW_BATCH, iter_xlsx
+
+NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+PACKAGE_PARTS = ("[Content_Types].xml", "_rels/.rels", "xl/workbook.xml", "xl/_rels/workbook.xml.rels", "xl/styles.xml")
+
+
+def _cell_value(cell: ElementTree.Element) -> str | None:
+    if cell.get("t") == "inlineStr":
+        return cell.find("s:is/s:t", NS).text
+    value = cell.find("s:v", NS)
+    return value.text if value is not None else None
+
+
+def _read_sheet(chunks) -> list[list[str | None]]:
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        for part in PACKAGE_PARTS:
+            ElementTree.fromstring(zf.read(part))
+        sheet = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+    return [[_cell_value(cell) for cell in row.findall("s:c", NS)] for row in sheet.findall("s:sheetData/s:row", NS)]
+
+
+def test_sheet_xml_round_trip():
+    rows = [
+        [1, "Rossi & <Bianchi>", date(2026, 3, 31), True, None],
+        [2.5, "tab\there\x01ctrl", "", False, "àèì"],
+    ]
+    parsed = _read_sheet(iter_xlsx("Certificazioni", ["id", "name", "expiry", "active", "notes"], rows))
+
+    assert parsed[0] == ["id", "name", "expiry", "active", "notes"]
+    assert parsed[1] == ["1", "Rossi & <Bianchi>", "2026-03-31", "1", None]
+    assert parsed[2] == ["2.5", "tab\therectrl", None, "0", "àèì"]
+
+
+def test_sheet_name_is_escaped_and_truncated():
+    chunks = list(iter_xlsx("A & B " + "x" * 40, ["h"], []))
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+    name = workbook.find("s:sheets/s:sheet", NS).get("name")
+    assert name == ("A & B " + "x" * 40)[:31]
+
+
+def test_many_rows_span_several_batches():
+    count = ROW_BATCH * 2 + 7
+    parsed = _read_sheet(iter_xlsx("s", ["n"], ([i] for i in range(count))))
+    assert len(parsed) == count + 1
+    assert parsed[-1] == [str(count - 1)]
@@ -0,0 +1,82 @@
+from datetime import datetime, UTC
+import hashlib
+import io
+import os
+import zipfile
+from app.services.zipstream import ZipStream
+
+MODIFIED = datetime(2026, 1, 2, 3, 4, 6, tzinfo=UTC)
+
+
+def _open(chunks) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_round_trip_files_streams_and_bytes(tmp_path):
+    payload = os.urandom(3 * 1024 * 1024 + 17)
+    source = tmp_path / "blob.bin"
+    source.write_bytes(payload)
+
+    archive = ZipStream()
+    chunks = []
+    chunks += archive.add_file("docs/blob.bin", source, MODIFIED, len(payload))
+    chunks += archive.add_stream("manifest.csv", iter([b"a,b\r\n", b"1,2\r\n"]), MODIFIED)
+    chunks += archive.add_bytes("note.txt", "àèì".encode(), MODIFIED)
+    chunks += archive.close()
+
+    with _open(chunks) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["docs/blob.bin", "manifest.csv", "note.txt"]
+        assert hashlib.sha256(zf.read("docs/blob.bin")).digest() == hashlib.sha256(payload).digest()
+        assert zf.read("manifest.csv") == b"a,b\r\n1,2\r\n"
+        assert zf.read("note.txt").decode() == "àèì"
+        info = zf.getinfo("docs/blob.bin")
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert info.date_time == (2026, 1, 2, 3, 4, 6)
+
+
+def test_sink_is_not_seekable_so_entries_use_data_descriptors(tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_bytes(b"hello")
+    archive = ZipStream()
+    assert not archive._sink.seekable()
+
+    chunks = list(archive.add_file("a.txt", source, MODIFIED, 5)) + list(archive.close())
+    with _open(chunks) as zf:
+        assert zf.getinfo("a.txt").flag_bits & 0x08
+        assert zf.read("a.txt") == b"hello"
+
+
+def test_output_is_emitted_incrementally(tmp_path):
+    payload = os.urandom(4 * 1024 * 1024)
+    source = tmp_path / "big.bin"
+    source.write_bytes(payload)
+    archive = ZipStream()
+
+    chunks = list(archive.add_file("big.bin", source, MODIFIED, len(payload)))
+    assert len(chunks) > 1
+    assert max(len(chunk) for chunk in chunks) <= 2 * 1024 * 1024
+
+
+def test_zip64_records_round_trip(tmp_path, monkeypatch):
+    # Lowering the limits makes zipfile write the zip64 extra fields and end records without 4 GiB of data.
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1024)
+    monkeypatch.setattr(zipfile, "ZIP_FILECOUNT_LIMIT", 2)
+    payload = os.urandom(8 * 1024)
+    source = tmp_path / "large.bin"
+    source.write_bytes(payload)
+
+    archive = ZipStream()
+    chunks = []
+    for index in range(3):
+        chunks += archive.add_file(f"large-{index}.bin", source, MODIFIED, len(payload))
+    chunks += archive.add_stream("stream.bin", iter([payload]), MODIFIED)
+    chunks += archive.close()
+
+    data = b"".join(chunks)
+    assert b"PK\x06\x06" in data
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 4
+        for name in zf.namelist():
+            assert zf.read(name) == payload